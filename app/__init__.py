@@ -5,22 +5,18 @@ from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 
 from dotenv import load_dotenv
-from os import getenv
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from os import getenv, path
 from datetime import timedelta
-import logging
 
 load_dotenv()
 
-logging.basicConfig(
-    #filename='app.log',
-    #filemode='a',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-
 jwt = JWTManager()
 db = SQLAlchemy()
 DB_NAME = 'database.db'
+MIGRATIONS_DIR = path.join(path.dirname(path.dirname(path.abspath(__file__))), 'migrations')
+SCHEMA_MODES = ('create', 'check', 'skip')
 
 
 def create_database(app):
@@ -29,8 +25,35 @@ def create_database(app):
         db.session.commit()
 
 
+def check_schema_version(app):
+    """
+    Refuses to start unless the database is at the newest migration. Costs one query against
+    alembic_version instead of the table-by-table inspection done by create_all.
+    """
+    from alembic.script import ScriptDirectory
+
+    heads = set(ScriptDirectory(MIGRATIONS_DIR).get_heads())
+
+    with app.app_context():
+        try:
+            current = set(db.session.scalars(text('SELECT version_num FROM alembic_version')))
+        except DBAPIError:
+            current = set()
+        finally:
+            db.session.remove()
+
+    if current != heads:
+        raise RuntimeError(
+            f"Database schema is at {sorted(current) or 'no revision'}, expected {sorted(heads)}. "
+            "Run 'flask db upgrade' before starting the application."
+        )
+
+
 def create_app():
     app = Flask(__name__)
+
+    from .logging_config import configure_logging
+    configure_logging(app)
     
     CORS(app)
     CORS(app, origins=["http://localhost:5173"])
@@ -38,6 +61,9 @@ def create_app():
     app.config['SECRET_KEY'] = 'secret'
     app.config['SQLALCHEMY_DATABASE_URI'] = getenv('DATABASE_URL')
 
+    from .pool import engine_options
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+
     db.init_app(app)
 
     app.config['JWT_SECRET_KEY'] = 'secret'
@@ -47,6 +73,14 @@ def create_app():
     
     jwt.init_app(app)
 
+    app.config['BCRYPT_LOG_ROUNDS'] = int(getenv('BCRYPT_LOG_ROUNDS', 12))
+    app.config['PASSWORD_POOL_SIZE'] = int(getenv('PASSWORD_POOL_SIZE', 4))
+    app.config['PASSWORD_QUEUE_DEPTH'] = int(getenv('PASSWORD_QUEUE_DEPTH', 16))
+    app.config['REVOCATION_CACHE_TTL'] = float(getenv('REVOCATION_CACHE_TTL', 5))
+
+    from utils import is_token_revoked
+    jwt.token_in_blocklist_loader(is_token_revoked)
+
     from .auth import auth
     from .routes.customer_routes import customer_routes
     from .routes.employee_routes import employee_routes
@@ -55,6 +89,7 @@ def create_app():
     from .routes.product_routes import product_routes
     from .routes.schedule_routes import schedule_routes
     from .routes.subscription_routes import subscription_routes
+    from .routes.internal_routes import internal_routes
 
     app.register_blueprint(auth, url_prefix='/api')
     app.register_blueprint(customer_routes, url_prefix='/api')
@@ -64,11 +99,34 @@ def create_app():
     app.register_blueprint(product_routes, url_prefix='/api')
     app.register_blueprint(schedule_routes, url_prefix='/api')
     app.register_blueprint(subscription_routes, url_prefix='/api')
+    app.register_blueprint(internal_routes, url_prefix='/api/internal')
 
     from . import models
 
-    create_database(app)
+    schema_mode = getenv('DB_SCHEMA_MODE', 'create').lower()
+    if schema_mode not in SCHEMA_MODES:
+        raise ValueError(f"DB_SCHEMA_MODE must be one of {', '.join(SCHEMA_MODES)}")
+
+    if schema_mode == 'create':
+        create_database(app)
+    elif schema_mode == 'check':
+        check_schema_version(app)
+
+    # Leave no pooled connections behind, with gunicorn --preload they would be shared by
+    # every forked worker
+    with app.app_context():
+        db.engine.dispose()
+
+    migrate = Migrate(app, db, directory=MIGRATIONS_DIR)
+
+    from .query_log import query_log
+    query_log.init_app(app)
+
+    if getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes'):
+        from .metrics import metrics
+        metrics.init_app(app)
 
-    migrate = Migrate(app, db)
+    from .importers import import_command
+    app.cli.add_command(import_command)
     
     return app
@@ -1,15 +1,14 @@
 from flask import Blueprint, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import create_access_token, get_jwt
-import bcrypt
 import logging
 from .models import Employee
+from .passwords import hash_password, check_password, needs_rehash, PasswordPoolSaturated
 from . import db
 from utils import role_required, check_gym_mismatch
 
-logging.basicConfig(level=logging.ERROR)
-
 auth = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
 
 
 @auth.route('/first_register', methods=['POST'])
@@ -17,34 +16,32 @@ def first_register():
     manager_exists = Employee.query.filter_by(role='manager').first()
 
     if manager_exists:
-        logging.error("Attempt to access 'first_register' route when a manager already exists.")
+        logger.error("Attempt to access 'first_register' route when a manager already exists.")
         return jsonify({'msg': "A manager already exists. This route is no longer accessible."}), 403
     
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for 'first_register'")
+        logger.error("No data provided for 'first_register'")
         return jsonify({"msg": "No data provided"}), 400
 
     required_fields = {'password', 'gym_id', 'first_name', 'last_name', 'role'}
     
     for field in required_fields:
         if field not in data:
-            logging.error(f"Missing required field in 'first_register': {field}")
+            logger.error("Missing required field in 'first_register': %s", field)
             return jsonify({"msg": f"Field '{field}' is required"}), 400
 
     if data['role'].lower() != 'manager':
-        logging.error("Invalid role provided for 'first_register'. First user must be a manager.")
+        logger.error("Invalid role provided for 'first_register'. First user must be a manager.")
         return jsonify({"msg": "The first user must have the role 'manager'"}), 400
 
     if len(data['password'])< 8:
-        logging.error("Password too short")
+        logger.error("Password too short")
         return jsonify({"msg": "password too short"}), 400
 
     try:
-        bytes_password = data['password'].encode('utf-8')
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(bytes_password, salt).decode('utf-8')
+        hashed_password = hash_password(data['password'])
 
         new_employee = Employee(
             password=hashed_password,
@@ -56,12 +53,17 @@ def first_register():
 
         db.session.add(new_employee)
         db.session.commit()
-        logging.info(f"Manager registered successfully: {data['first_name']} {data['last_name']}, Gym ID: {data['gym_id']}")
+        logger.info("Manager registered successfully: %s %s, Gym ID: %s", data['first_name'], data['last_name'], data['gym_id'])
         return jsonify({"msg": "User registered successfully"}), 201
 
+    except PasswordPoolSaturated:
+        db.session.rollback()
+        logger.warning("Password hashing pool is saturated, rejecting registration")
+        return jsonify({"msg": "Server is busy, try again later"}), 503
+
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred during registration: {str(e)}")
+        logger.error("An error occurred during registration: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
     
 
@@ -71,24 +73,22 @@ def register():
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for 'register'")
+        logger.error("No data provided for 'register'")
         return jsonify({"msg": "No data provided"}), 400
 
     required_fields = {'password', 'gym_id', 'first_name', 'last_name', 'role'}
 
     for field in required_fields:
         if field not in data:
-            logging.error(f"Missing required field in 'register': {field}")
+            logger.error("Missing required field in 'register': %s", field)
             return jsonify({"msg": f"Field '{field}' is required"}), 400
     
     if len(data['password'])< 4:
-        logging.error("Password too short")
+        logger.error("Password too short")
         return jsonify({"msg": "password too short"}), 400
     
     try:
-        bytes_password = data['password'].encode('utf-8')
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(bytes_password, salt).decode('utf-8')
+        hashed_password = hash_password(data['password'])
 
         new_employee = Employee(
             password=hashed_password,
@@ -100,12 +100,17 @@ def register():
 
         db.session.add(new_employee)
         db.session.commit()
-        logging.info(f"Employee registered successfully: {data['first_name']} {data['last_name']}, Role: {data['role']}, Gym ID: {data['gym_id']}")
+        logger.info("Employee registered successfully: %s %s, Role: %s, Gym ID: %s", data['first_name'], data['last_name'], data['role'], data['gym_id'])
         return jsonify({"msg": "User registered successfully"}), 201
 
+    except PasswordPoolSaturated:
+        db.session.rollback()
+        logger.warning("Password hashing pool is saturated, rejecting registration")
+        return jsonify({"msg": "Server is busy, try again later"}), 503
+
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred during registration: {str(e)}")
+        logger.error("An error occurred during registration: %s", e)
 
         return jsonify({"msg": "An internal error occurred"}), 500
 
@@ -115,14 +120,14 @@ def login():
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for login")
+        logger.error("No data provided for login")
         return jsonify({"msg": "No data provided"}), 400
 
     required_fields = {'employee_id', 'password', 'gym_id'}
 
     for field in required_fields:
         if field not in data:
-            logging.error(f"Missing required field: {field}")
+            logger.error("Missing required field: %s", field)
             return jsonify({"msg": f"Field '{field}' is required"}), 400
 
     employee_id = data['employee_id']
@@ -133,23 +138,42 @@ def login():
     try:
         user = Employee.query.filter_by(employee_id=employee_id, gym_id=gym_id).first()
         if user:
-            bytes_password = password.encode('utf-8')
-            user_bytes = user.password.encode('utf-8')
-
-            if bcrypt.checkpw(bytes_password, user_bytes):
-                access_token = create_access_token(
-                    identity=str(user.employee_id),
-                    additional_claims={"role": user.role, "gym_id": gym_id, "first_name": user.first_name, "last_name": user.last_name}
-                )
-                logging.info(f"User {employee_id} logged in successfully at gym {gym_id}. Issued JWT: {access_token}")
+            if check_password(password, user.password):
+                # Read before the rehash, a rolled back session would reload them from the database
+                identity = str(user.employee_id)
+                claims = {
+                    "role": user.role, "gym_id": gym_id, "first_name": user.first_name, "last_name": user.last_name,
+                    "ver": user.token_version,
+                }
+
+                if needs_rehash(user.password):
+                    # Best effort, the login itself already succeeded
+                    try:
+                        user.password = hash_password(password)
+                        db.session.commit()
+                        logger.info("Password hash for user %s upgraded to the configured cost", employee_id)
+                    except PasswordPoolSaturated:
+                        db.session.rollback()
+                    except Exception as e:
+                        db.session.rollback()
+                        logger.error("Could not upgrade the password hash for user %s: %s", employee_id, e)
+
+                access_token = create_access_token(identity=identity, additional_claims=claims)
+                logger.info("User %s logged in successfully at gym %s", employee_id, gym_id)
                 return jsonify({'message': 'Login Success', 'access_token': access_token}), 200
             else:
-                logging.warning(f"Failed login attempt for employee_id: {employee_id} at gym {gym_id}")
+                logger.warning("Failed login attempt for employee_id: %s at gym %s", employee_id, gym_id)
                 return jsonify({'message': 'Invalid credentials'}), 401
 
-        logging.warning(f"Login attempt for non-existing user or invalid gym: employee_id {employee_id}, gym_id {gym_id}")
+        logger.warning("Login attempt for non-existing user or invalid gym: employee_id %s, gym_id %s", employee_id, gym_id)
         return jsonify({'message': 'User does not exist or gym mismatch'}), 404
 
+    except PasswordPoolSaturated:
+        db.session.rollback()
+        logger.warning("Password hashing pool is saturated, rejecting login")
+        return jsonify({"msg": "Server is busy, try again later"}), 503
+
     except Exception as e:
-        logging.error(f"An error occurred during login: {str(e)}")
+        db.session.rollback()
+        logger.error("An error occurred during login: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
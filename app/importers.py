@@ -0,0 +1,283 @@
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from .models import Customer, Product, Subscription, Gym, subscription_expiry_date
+from . import db
+import click
+import csv
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+class RowError(ValueError):
+    pass
+
+
+def _decode_lines(stream, failed):
+    # Decodes line by line so an invalid byte is tied to its row instead of a whole read buffer
+    for line in stream:
+        try:
+            yield line.decode('utf-8')
+        except UnicodeDecodeError:
+            failed.append(line)
+            return
+
+
+def read_records(stream, import_format):
+    """
+    Yields one dict per row of a binary `stream`, or the RowError for a row that can't be parsed.
+    Columns the importers don't know, like customer_id from an export, are ignored later.
+    """
+    if import_format == 'csv':
+        failed = []
+        yield from csv.DictReader(_decode_lines(stream, failed))
+        if failed:
+            # A CSV row may span lines, so the reader can't resume after an undecodable one
+            yield RowError("Row is not valid UTF-8, the rest of the file was skipped")
+        return
+
+    for line in stream:
+        try:
+            line = line.decode('utf-8')
+        except UnicodeDecodeError:
+            yield RowError("Row is not valid UTF-8")
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield RowError("Invalid JSON")
+            continue
+        yield record if isinstance(record, dict) else RowError("Row must be a JSON object")
+
+
+def detect_format(filename, requested=None):
+    import_format = requested or ('csv' if (filename or '').lower().endswith('.csv') else 'ndjson')
+    return import_format if import_format in IMPORT_FORMATS else None
+
+
+def _int(record, key, required=False, default=None):
+    value = record.get(key)
+
+    if value is None or value == '':
+        if required:
+            raise RowError(f"Field '{key}' is required")
+        return default
+
+    if isinstance(value, bool):
+        raise RowError(f"{key} must be an integer")
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{key} must be an integer")
+
+
+def _decimal(record, key, required=False, default=None):
+    value = record.get(key)
+
+    if value is None or value == '':
+        if required:
+            raise RowError(f"Field '{key}' is required")
+        return default
+
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise RowError(f"{key} must be a number")
+
+
+def _str(record, key, max_length=None):
+    value = record.get(key)
+
+    if value is None or value == '':
+        raise RowError(f"Field '{key}' is required")
+
+    value = str(value)
+
+    if max_length and len(value) > max_length:
+        raise RowError(f"{key} must be at most {max_length} characters long")
+
+    return value
+
+
+def _date(record, key):
+    value = record.get(key)
+
+    if value is None or value == '':
+        return None
+
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise RowError(f"{key} must be in the format 'YYYY-MM-DD'")
+
+
+def parse_customer(record):
+    return {
+        "subscription_id": _int(record, 'subscription_id'),
+        "first_name": _str(record, 'first_name', 50),
+        "last_name": _str(record, 'last_name', 50),
+        "address": _str(record, 'address'),
+        "phone_number": _str(record, 'phone_number', 12),
+        "sub_purchase_date": _date(record, 'sub_purchase_date'),
+    }
+
+
+def resolve_customers(chunk, errors):
+    # One lookup per chunk for every subscription it references
+    subscription_ids = {row["subscription_id"] for _, row in chunk if row["subscription_id"] is not None}
+    periods = dict(db.session.execute(
+        select(Subscription.subscription_id, Subscription.period).where(Subscription.subscription_id.in_(subscription_ids))
+    ).all()) if subscription_ids else {}
+
+    rows = []
+    for row_number, row in chunk:
+        if row["subscription_id"] is not None and row["subscription_id"] not in periods:
+            errors.append((row_number, f"subscription_id {row['subscription_id']} does not exist"))
+            continue
+
+        row["sub_expiry_date"] = subscription_expiry_date(row["sub_purchase_date"], periods.get(row["subscription_id"]))
+        rows.append((row_number, row))
+
+    return rows
+
+
+def parse_product(record, gym_id=None):
+    row = {
+        "gym_id": _int(record, 'gym_id', required=gym_id is None, default=gym_id),
+        "name": _str(record, 'name', 50),
+        "quantity_in_stock": _int(record, 'quantity_in_stock', default=0),
+        "quantity_sold": _int(record, 'quantity_sold', default=0),
+        "price": _decimal(record, 'price', required=True),
+        "total_revenue": _decimal(record, 'total_revenue', default=Decimal(0)),
+    }
+
+    if gym_id is not None and row["gym_id"] != gym_id:
+        raise RowError("You are not authorized to modify this gym")
+
+    if row["quantity_in_stock"] < 0 or row["quantity_sold"] < 0:
+        raise RowError("Quantities must be non-negative integers")
+
+    if not Decimal(0) <= row["price"] < Decimal(1000):
+        raise RowError("price must be between 0 and 999.99")
+
+    return row
+
+
+def resolve_products(chunk, errors):
+    gym_ids = {row["gym_id"] for _, row in chunk}
+    existing_gyms = set(db.session.scalars(select(Gym.gym_id).where(Gym.gym_id.in_(gym_ids))))
+
+    rows = []
+    for row_number, row in chunk:
+        if row["gym_id"] not in existing_gyms:
+            errors.append((row_number, f"gym_id {row['gym_id']} does not exist"))
+            continue
+        rows.append((row_number, row))
+
+    return rows
+
+
+def insert_chunk(model, rows, errors):
+    """
+    Writes a chunk with one multi-row INSERT. If the database rejects it, the rows are retried
+    one by one in savepoints so only the offending rows are reported.
+    """
+    if not rows:
+        return 0
+
+    try:
+        db.session.execute(insert(model), [row for _, row in rows])
+        db.session.commit()
+        return len(rows)
+    except DBAPIError:
+        db.session.rollback()
+
+    imported = 0
+    for row_number, row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(model), [row])
+            imported += 1
+        except DBAPIError as e:
+            errors.append((row_number, str(e.orig)))
+    db.session.commit()
+
+    return imported
+
+
+def import_records(records, model, parse, resolve):
+    """
+    Imports `records` in chunks of IMPORT_CHUNK_SIZE. Invalid rows are skipped and reported,
+    they never abort the rest of the import.
+    """
+    imported = 0
+    errors = []
+    chunk = []
+
+    def flush():
+        rows = resolve(chunk, errors)
+        chunk.clear()
+        return insert_chunk(model, rows, errors)
+
+    for row_number, record in enumerate(records, start=1):
+        try:
+            if isinstance(record, RowError):
+                raise record
+            chunk.append((row_number, parse(record)))
+        except RowError as e:
+            errors.append((row_number, str(e)))
+
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            imported += flush()
+
+    imported += flush()
+
+    return {
+        "imported": imported,
+        "failed": len(errors),
+        "errors": [{"row": row_number, "msg": msg} for row_number, msg in sorted(errors)[:MAX_REPORTED_ERRORS]],
+    }
+
+
+def import_customers(stream, import_format):
+    return import_records(read_records(stream, import_format), Customer, parse_customer, resolve_customers)
+
+
+def import_products(stream, import_format, gym_id=None):
+    return import_records(
+        read_records(stream, import_format),
+        Product,
+        lambda record: parse_product(record, gym_id),
+        resolve_products
+    )
+
+
+@click.command('import')
+@click.argument('table', type=click.Choice(['customers', 'products']))
+@click.argument('file', type=click.File('rb'))
+@click.option('--format', 'import_format', type=click.Choice(IMPORT_FORMATS), default=None,
+              help='Defaults to the file extension.')
+def import_command(table, file, import_format):
+    """Bulk imports customers or products from a CSV or NDJSON file."""
+    import_format = detect_format(file.name, import_format)
+
+    if table == 'customers':
+        summary = import_customers(file, import_format)
+    else:
+        summary = import_products(file, import_format)
+
+    logger.info("Imported %s %s, %s rows failed", summary['imported'], table, summary['failed'])
+    click.echo(f"Imported {summary['imported']} {table}, {summary['failed']} rows failed")
+
+    for error in summary["errors"]:
+        click.echo(f"  row {error['row']}: {error['msg']}")
@@ -0,0 +1,163 @@
+from flask import has_request_context, request
+from logging.handlers import QueueHandler, QueueListener
+from datetime import datetime, timezone
+from os import getenv, register_at_fork
+import atexit
+import logging
+import queue
+import re
+
+try:
+    import orjson
+
+    def _dumps(payload):
+        return orjson.dumps(payload, default=str).decode()
+except ImportError:
+    import json
+
+    def _dumps(payload):
+        return json.dumps(payload, default=str)
+
+
+SECRET_PATTERNS = (
+    re.compile(r'eyJ[\w-]+\.[\w-]+\.[\w-]+'),
+    re.compile(r'(Bearer\s+)\S+', re.IGNORECASE),
+)
+
+# TimedQueuePool lives in app.pool, so SQLAlchemy's pool chatter would otherwise log at the
+# app level instead of under the quiet sqlalchemy.pool logger
+DEFAULT_LEVELS = {'app.pool': 'WARNING'}
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+_listener = None
+_queue_handler = None
+
+
+def redact(message):
+    message = SECRET_PATTERNS[0].sub('[REDACTED]', message)
+    return SECRET_PATTERNS[1].sub(r'\1[REDACTED]', message)
+
+
+class RequestContextFilter(logging.Filter):
+    """Tags records with the Flask endpoint while still on the request thread."""
+
+    def filter(self, record):
+        record.endpoint = request.endpoint if has_request_context() else None
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Enqueues records without formatting them. The stock QueueHandler interpolates the message
+    on the calling thread; here only tracebacks are rendered eagerly and the message, JSON
+    encoding and redaction all happen in the listener thread.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            # Tracebacks hold frames of the request thread, render them before they go away
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+            "module": record.module,
+            "endpoint": getattr(record, 'endpoint', None),
+        }
+
+        if record.exc_text:
+            payload["exc"] = redact(record.exc_text)
+
+        return _dumps(payload)
+
+
+class RedactingFormatter(logging.Formatter):
+
+    def format(self, record):
+        return redact(super().format(record))
+
+
+def parse_levels(spec):
+    """Parses LOG_LEVELS, e.g. "app.query_log=DEBUG,sqlalchemy.engine=WARNING"."""
+    levels = {}
+
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        levels[name.strip()] = level.strip().upper()
+
+    return levels
+
+
+def _restart_after_fork():
+    # Only the forking thread survives a fork, so a worker forked from a preloading master
+    # (gunicorn --preload) needs its own listener thread and queue
+    global _listener
+
+    if _listener is None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(app):
+    """
+    Routes the root logger through a queue so request threads never block on log I/O. A single
+    listener thread formats the records (JSON by default) and writes them to stderr or LOG_FILE.
+    Safe to call once per create_app; only the first call installs the pipeline.
+    """
+    global _listener, _queue_handler
+
+    root = logging.getLogger()
+    root.setLevel(getenv('LOG_LEVEL', 'INFO').upper())
+
+    for name, level in {**DEFAULT_LEVELS, **parse_levels(getenv('LOG_LEVELS', ''))}.items():
+        logging.getLogger(name).setLevel(level)
+
+    if _listener is not None:
+        return
+
+    log_file = getenv('LOG_FILE')
+    output = logging.FileHandler(log_file) if log_file else logging.StreamHandler()
+
+    if getenv('LOG_FORMAT', 'json').lower() == 'text':
+        output.setFormatter(RedactingFormatter(TEXT_FORMAT))
+    else:
+        output.setFormatter(JSONFormatter())
+
+    log_queue = queue.SimpleQueue()
+
+    _queue_handler = DeferredQueueHandler(log_queue)
+    _queue_handler.addFilter(RequestContextFilter())
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+    atexit.register(stop_logging)
+    register_at_fork(after_in_child=_restart_after_fork)
+
+    app.logger.debug("Logging pipeline started (%s)", log_file or 'stderr')
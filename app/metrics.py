@@ -0,0 +1,82 @@
+from flask import g, request, jsonify
+from hmac import compare_digest
+from os import getenv
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from time import perf_counter
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LABELS = ('blueprint', 'endpoint', 'method')
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency in seconds', LABELS, buckets=BUCKETS)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds', 'Time spent in database queries per request in seconds', LABELS, buckets=BUCKETS
+)
+REQUESTS = Counter('http_requests', 'Requests by status code', LABELS + ('status',))
+DB_QUERIES = Counter('http_request_db_queries', 'Database queries issued by requests', LABELS)
+# livesum drops the share of workers that exited, see child_exit in gunicorn.conf.py
+IN_FLIGHT = Gauge('http_requests_in_flight', 'Requests being served', multiprocess_mode='livesum')
+
+
+class Metrics:
+    """
+    Request metrics rendered in the Prometheus text format on /metrics.
+
+    Under gunicorn every worker writes its numbers to files in PROMETHEUS_MULTIPROC_DIR and a
+    scrape sums them over all workers, including ones recycled since; without it the numbers
+    are those of the current process.
+    """
+
+    def __init__(self, app=None):
+        self.token = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.token = getenv('METRICS_TOKEN') or None
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.render)
+
+    def before_request(self):
+        g.request_start = perf_counter()
+        IN_FLIGHT.inc()
+
+    def after_request(self, response):
+        g.response_status = response.status_code
+        return response
+
+    def teardown_request(self, exc):
+        start = g.pop('request_start', None)
+
+        if start is None:
+            return
+
+        elapsed = perf_counter() - start
+        labels = (request.blueprint or 'none', request.endpoint or 'none', request.method)
+        status = g.pop('response_status', 500)
+
+        IN_FLIGHT.dec()
+        REQUEST_LATENCY.labels(*labels).observe(elapsed)
+        # Filled in by app.query_log
+        REQUEST_DB_TIME.labels(*labels).observe(g.get('db_time', 0.0))
+        DB_QUERIES.labels(*labels).inc(g.get('query_count', 0))
+        REQUESTS.labels(*labels, status).inc()
+
+    def render(self):
+        # Scrapers can't log in, so /metrics takes a static bearer token instead of a JWT
+        if self.token and not compare_digest(request.headers.get('Authorization', ''), f'Bearer {self.token}'):
+            return jsonify({'msg': 'Access denied'}), 403
+
+        if getenv('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+
+        return generate_latest(registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
+
+metrics = Metrics()
@@ -1,14 +1,20 @@
 from . import db
-from sqlalchemy import Date
+from sqlalchemy import Date, func
+from datetime import datetime, time, timedelta
+
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+MINUTES_PER_DAY = 24 * 60
+TIME_FORMATS = ('%H:%M', '%H:%M:%S')
 
 
 class Employee(db.Model):
     employee_id = db.Column(db.Integer, primary_key=True)
-    gym_id = db.Column(db.Integer, db.ForeignKey('gym.gym_id'), nullable=True) # Allow null
+    gym_id = db.Column(db.Integer, db.ForeignKey('gym.gym_id'), nullable=True, index=True) # Allow null
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
-    role = db.Column(db.String(50), nullable=False)
+    role = db.Column(db.String(50), nullable=False, index=True)
     password = db.Column(db.Text, nullable=False)
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Bumped to revoke issued tokens
 
     # Relations
     gym = db.relationship('Gym', back_populates='employees')
@@ -17,18 +23,83 @@ class Employee(db.Model):
 
 
 class Customer(db.Model):
+    __table_args__ = (
+        # Range scans and keyset pagination over expiry dates
+        db.Index('ix_customer_sub_expiry_date_customer_id', 'sub_expiry_date', 'customer_id'),
+    )
+
     customer_id = db.Column(db.Integer, primary_key=True)
-    subscription_id = db.Column(db.Integer, db.ForeignKey('subscription.subscription_id'), nullable=True) # Allow null
+    subscription_id = db.Column(db.Integer, db.ForeignKey('subscription.subscription_id'), nullable=True, index=True) # Allow null
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
     address = db.Column(db.Text)
     phone_number = db.Column(db.String(12))
     sub_purchase_date = db.Column(Date)
+    sub_expiry_date = db.Column(Date) # sub_purchase_date + Subscription.period, kept in sync by the routes
 
     # Relations
     subscription = db.relationship('Subscription', back_populates='customers')
 
 
+def subscription_expiry_date(purchase_date, period):
+    if purchase_date is None or period is None:
+        return None
+
+    return purchase_date + timedelta(days=period)
+
+
+def subscription_expiry_sql(period):
+    # SQL expression for sub_purchase_date + period days, used by bulk updates
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return func.date(Customer.sub_purchase_date, f'+{int(period)} days')
+
+    return Customer.sub_purchase_date + int(period)
+
+
+# Days are stored as 0 (Monday) to 6 and times as minutes since Monday 00:00, so a time window
+# on one day is a single range on an integer index. The API speaks day names and HH:MM.
+
+
+def day_number(value):
+    if isinstance(value, str):
+        name = value.strip().lower()
+        for number, day in enumerate(DAYS):
+            if name in (day.lower(), day[:3].lower()):
+                return number
+
+    raise ValueError(value)
+
+
+def day_name(number):
+    return DAYS[number]
+
+
+def parse_time(value):
+    if not isinstance(value, str):
+        raise ValueError(value)
+
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.strptime(value, time_format).time()
+        except ValueError:
+            pass
+
+    raise ValueError(value)
+
+
+def minute_of_week(day, value):
+    return day * MINUTES_PER_DAY + value.hour * 60 + value.minute
+
+
+def time_of_minute(minute):
+    minute %= MINUTES_PER_DAY
+    return time(minute // 60, minute % 60)
+
+
+def format_minute(minute):
+    return str(time_of_minute(minute))
+
+
 class Subscription(db.Model):
     subscription_id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.String(50), nullable=False)
@@ -43,6 +114,7 @@ class Gym(db.Model):
     gym_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
     address = db.Column(db.Text)
+    timetable_version = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Bumped by timetable writes
 
     # Relations
     employees = db.relationship('Employee', back_populates='gym')
@@ -52,13 +124,20 @@ class Gym(db.Model):
 
 
 class Schedule(db.Model):
+    __table_args__ = (
+        # Per-gym listings ordered by schedule_id
+        db.Index('ix_schedule_gym_id_schedule_id', 'gym_id', 'schedule_id'),
+        # Time windows within a gym's week
+        db.Index('ix_schedule_gym_id_start_minute', 'gym_id', 'start_minute'),
+    )
+
     schedule_id = db.Column(db.Integer, primary_key=True)
-    gymclass_id = db.Column(db.Integer, db.ForeignKey('gym_class.gymclass_id'))
+    gymclass_id = db.Column(db.Integer, db.ForeignKey('gym_class.gymclass_id'), index=True)
     gym_id = db.Column(db.Integer, db.ForeignKey('gym.gym_id'), nullable=True) # Allow null
-    employee_id = db.Column(db.Integer, db.ForeignKey('employee.employee_id'))
-    day_otw = db.Column(db.String(15), nullable=False)
-    start_time = db.Column(db.Time, nullable=False)
-    end_time = db.Column(db.Time, nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employee.employee_id'), index=True)
+    day_otw = db.Column(db.SmallInteger, nullable=False) # 0 = Monday
+    start_minute = db.Column(db.Integer, nullable=False) # Minutes since Monday 00:00
+    end_minute = db.Column(db.Integer, nullable=False)
     entry_type = db.Column(db.String(10), nullable=False)
 
     # Relations
@@ -69,7 +148,7 @@ class Schedule(db.Model):
 
 class Product(db.Model):
     product_id = db.Column(db.Integer, primary_key=True)
-    gym_id = db.Column(db.Integer, db.ForeignKey('gym.gym_id'), nullable=True) # Allow null
+    gym_id = db.Column(db.Integer, db.ForeignKey('gym.gym_id'), nullable=True, index=True) # Allow null
     name = db.Column(db.String(50), nullable=False)
     quantity_in_stock = db.Column(db.Integer, default=0)
     quantity_sold = db.Column(db.Integer, default=0)
@@ -78,16 +157,63 @@ class Product(db.Model):
 
     # Relations
     gym = db.relationship('Gym', back_populates='products')
+    sales = db.relationship('Sale', back_populates='product')
+
+
+class Sale(db.Model):
+    sale_id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.product_id'), nullable=True, index=True) # Allow null
+    gym_id = db.Column(db.Integer, db.ForeignKey('gym.gym_id'), nullable=True, index=True) # Allow null
+    quantity = db.Column(db.Integer, nullable=False)
+    unit_price = db.Column(db.Numeric(5, 2), nullable=False)
+    amount = db.Column(db.Numeric(12, 2), nullable=False)
+    sold_at = db.Column(db.DateTime, nullable=False, server_default=func.now())
+
+    # Relations
+    product = db.relationship('Product', back_populates='sales')
+
+
+# Revenue rollups are maintained incrementally by every sale, reports read them instead of the Sale ledger.
+# They have no foreign keys so history survives deleted products and gyms.
+class DailyRevenue(db.Model):
+    __table_args__ = (
+        db.Index('ix_daily_revenue_gym_id_day', 'gym_id', 'day'),
+    )
+
+    day = db.Column(Date, primary_key=True)
+    gym_id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)
+    quantity_sold = db.Column(db.Integer, nullable=False)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False)
+
+
+class MonthlyRevenue(db.Model):
+    __table_args__ = (
+        db.Index('ix_monthly_revenue_gym_id_month', 'gym_id', 'month'),
+    )
+
+    month = db.Column(Date, primary_key=True) # First day of the month
+    gym_id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)
+    quantity_sold = db.Column(db.Integer, nullable=False)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False)
 
 
 class GymClass(db.Model):
+    __table_args__ = (
+        # Time window search, ordered by (minute_of_week, gymclass_id) for keyset pagination,
+        # optionally narrowed to one coach
+        db.Index('ix_gym_class_gym_id_minute_of_week_gymclass_id', 'gym_id', 'minute_of_week', 'gymclass_id'),
+        db.Index('ix_gym_class_gym_id_employee_id_minute_of_week', 'gym_id', 'employee_id', 'minute_of_week', 'gymclass_id'),
+    )
+
     gymclass_id = db.Column(db.Integer, primary_key=True)
-    employee_id = db.Column(db.Integer, db.ForeignKey('employee.employee_id'), nullable=True) # Allow null
-    gym_id = db.Column(db.Integer, db.ForeignKey('gym.gym_id'), nullable=True) # Allow null
+    employee_id = db.Column(db.Integer, db.ForeignKey('employee.employee_id'), nullable=True, index=True) # Allow null
+    gym_id = db.Column(db.Integer, db.ForeignKey('gym.gym_id'), nullable=True, index=True) # Allow null
     name = db.Column(db.String(50), nullable=False)
     max_people = db.Column(db.Integer, nullable=False)
-    time = db.Column(db.Time, nullable=False)
-    day_otw = db.Column(db.String(15), nullable=False)
+    minute_of_week = db.Column(db.Integer, nullable=False) # Start, minutes since Monday 00:00
+    day_otw = db.Column(db.SmallInteger, nullable=False) # 0 = Monday
     signed_people = db.Column(db.Integer, nullable=False)
 
     # Relations
@@ -96,9 +222,14 @@ class GymClass(db.Model):
     schedules = db.relationship('Schedule', back_populates='gym_class')
 
 class CustomerGymClass(db.Model):
+    __table_args__ = (
+        # Also serves lookups by customer_id alone
+        db.UniqueConstraint('customer_id', 'gymclass_id', name='uq_customer_gymclass'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customer.customer_id'), nullable=False)
-    gymclass_id = db.Column(db.Integer, db.ForeignKey('gym_class.gymclass_id'), nullable=False)
+    gymclass_id = db.Column(db.Integer, db.ForeignKey('gym_class.gymclass_id'), nullable=False, index=True)
 
     # Relations
     customer = db.relationship('Customer', backref='gym_classes')
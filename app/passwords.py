@@ -0,0 +1,65 @@
+from flask import current_app
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+import bcrypt
+
+# bcrypt releases the GIL, so a thread pool is enough to keep hashing off the request threads.
+# Pool size and queue depth are read from the app config the first time a password is hashed.
+_executor = None
+_slots = None
+_init_lock = Lock()
+
+
+class PasswordPoolSaturated(Exception):
+    pass
+
+
+def _get_pool():
+    global _executor, _slots
+
+    if _executor is None:
+        with _init_lock:
+            if _executor is None:
+                pool_size = current_app.config['PASSWORD_POOL_SIZE']
+                queue_depth = current_app.config['PASSWORD_QUEUE_DEPTH']
+
+                _slots = BoundedSemaphore(pool_size + queue_depth)
+                _executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='bcrypt')
+
+    return _executor, _slots
+
+
+def _run(func, *args):
+    executor, slots = _get_pool()
+
+    # Fail fast instead of queueing requests behind a login burst
+    if not slots.acquire(blocking=False):
+        raise PasswordPoolSaturated()
+
+    try:
+        future = executor.submit(func, *args)
+    except Exception:
+        slots.release()
+        raise
+
+    future.add_done_callback(lambda _: slots.release())
+    return future.result()
+
+
+def hash_password(password):
+    salt = bcrypt.gensalt(rounds=current_app.config['BCRYPT_LOG_ROUNDS'])
+    return _run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+
+def check_password(password, hashed_password):
+    return _run(bcrypt.checkpw, password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+def needs_rehash(hashed_password):
+    # Hashes look like $2b$<cost>$<salt+digest>
+    try:
+        cost = int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return True
+
+    return cost != current_app.config['BCRYPT_LOG_ROUNDS']
@@ -0,0 +1,83 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from threading import Lock
+from time import perf_counter
+from os import getenv, getpid
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_lock = Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = perf_counter() - start
+            with self.wait_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+def is_memory_sqlite(database_url):
+    # Flask-SQLAlchemy gives these a StaticPool, which takes none of the QueuePool sizing options
+    url = make_url(database_url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(database_url):
+    """Engine options from the DB_* environment variables."""
+    options = {
+        'pool_recycle': int(getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+    }
+
+    if database_url and not is_memory_sqlite(database_url):
+        options.update({
+            'poolclass': TimedQueuePool,
+            'pool_size': int(getenv('DB_POOL_SIZE', 5)),
+            'max_overflow': int(getenv('DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': float(getenv('DB_POOL_TIMEOUT', 30)),
+        })
+
+    statement_timeout = int(getenv('DB_STATEMENT_TIMEOUT_MS', 0))
+
+    if statement_timeout and (database_url or '').startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+
+    return options
+
+
+def pool_stats(engine):
+    pool = engine.pool
+
+    if not isinstance(pool, QueuePool):
+        return {"pid": getpid(), "poolclass": type(pool).__name__}
+
+    stats = {
+        "pid": getpid(),
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+    }
+
+    if isinstance(pool, TimedQueuePool):
+        with pool.wait_lock:
+            stats.update({
+                "checkouts": pool.checkouts,
+                "wait_total_ms": round(pool.wait_total * 1000, 3),
+                "wait_avg_ms": round(pool.wait_total * 1000 / pool.checkouts, 3) if pool.checkouts else 0.0,
+                "wait_max_ms": round(pool.wait_max * 1000, 3),
+            })
+
+    return stats
@@ -0,0 +1,89 @@
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from os import getenv
+from time import perf_counter
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLog:
+    """
+    Counts queries and database time per request (g.query_count, g.db_time), logs slow queries
+    with the endpoint that ran them and, when enabled, flags statements repeated within one
+    request as likely N+1 patterns.
+    """
+
+    def __init__(self, app=None):
+        self.slow_query_seconds = 0.2
+        self.detect_n_plus_one = False
+        self.n_plus_one_threshold = 5
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.slow_query_seconds = float(getenv('SLOW_QUERY_MS', 200)) / 1000
+        self.detect_n_plus_one = getenv('DETECT_N_PLUS_ONE', 'true' if app.debug else 'false').lower() in ('1', 'true', 'yes')
+        self.n_plus_one_threshold = int(getenv('N_PLUS_ONE_THRESHOLD', 5))
+
+        app.before_request(self.before_request)
+        app.teardown_request(self.teardown_request)
+
+        if not getattr(QueryLog, 'sql_hooks_installed', False):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            QueryLog.sql_hooks_installed = True
+
+    def before_request(self):
+        g.db_time = 0.0
+        g.query_count = 0
+
+        if self.detect_n_plus_one:
+            g.statement_counts = {}
+
+    def teardown_request(self, exc):
+        statement_counts = g.pop('statement_counts', None)
+
+        logger.debug(
+            "%s %s ran %d queries in %.1f ms",
+            request.method, request.path, g.get('query_count', 0), g.get('db_time', 0.0) * 1000
+        )
+
+        if not statement_counts:
+            return
+
+        for statement, count in statement_counts.items():
+            if count >= self.n_plus_one_threshold:
+                logger.warning(
+                    "Possible N+1 in %s: statement ran %d times in one request: %s",
+                    request.endpoint, count, statement[:300]
+                )
+
+    def record(self, statement, elapsed):
+        g.db_time = g.get('db_time', 0.0) + elapsed
+        g.query_count = g.get('query_count', 0) + 1
+
+        statement_counts = g.get('statement_counts')
+        if statement_counts is not None:
+            # Parameters are bound separately, so the statement text is already its shape
+            statement_counts[statement] = statement_counts.get(statement, 0) + 1
+
+        if elapsed >= self.slow_query_seconds:
+            logger.warning("Slow query (%.1f ms) in %s: %s", elapsed * 1000, request.endpoint, statement[:1000])
+
+
+query_log = QueryLog()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        context._query_start = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_query_start', None)
+
+    if start is not None and has_request_context():
+        query_log.record(statement, perf_counter() - start)
@@ -1,11 +1,27 @@
 from flask import Blueprint, request, jsonify
-from app.models import Customer, Subscription
-from app import db
+from app.models import Customer, Subscription, subscription_expiry_date
+from app import db, importers
+from sqlalchemy import select
 import logging
-from datetime import datetime, date, timedelta
-from utils import role_required
+from datetime import datetime, date
+from app.serialization import fetch_one, json_response, as_str
+from utils import role_required, paginate, export_rows
 
 customer_routes = Blueprint('customer_routes', __name__)
+logger = logging.getLogger(__name__)
+
+MAX_BULK_VALIDITY_CHECK = 1000
+
+CUSTOMER_FIELDS = (
+    ("customer_id", Customer.customer_id, None),
+    ("subscription_id", Customer.subscription_id, None),
+    ("first_name", Customer.first_name, None),
+    ("last_name", Customer.last_name, None),
+    ("address", Customer.address, None),
+    ("phone_number", Customer.phone_number, None),
+    ("sub_purchase_date", Customer.sub_purchase_date, str),
+    ("sub_expiry_date", Customer.sub_expiry_date, as_str),
+)
 
 
 @customer_routes.route('/add_customer', methods=['POST'])
@@ -14,41 +30,40 @@ def add_customer():
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for adding a customer")
+        logger.error("No data provided for adding a customer")
         return jsonify({"msg": "No data provided"}), 400
 
     required_fields = {'first_name', 'last_name', 'address', 'phone_number'}
 
     for field in required_fields:
         if field not in data:
-            logging.error(f"Missing required field: {field}")
+            logger.error("Missing required field: %s", field)
             return jsonify({"msg": f"Field '{field}' is required"}), 400
 
     if 'customer_id' in data and (not isinstance(data['customer_id'], int) or data['customer_id'] <= 0):
-        logging.error("Invalid customer_id provided")
+        logger.error("Invalid customer_id provided")
         return jsonify({"msg": "customer_id must be a positive integer"}), 400
     
     if 'subscription_id' in data and (data['subscription_id'] and not isinstance(data['subscription_id'], int)):
-        logging.error("Invalid subscription_id provided")
+        logger.error("Invalid subscription_id provided")
         return jsonify({"msg": "subscription_id must be an integer"}), 400
 
     subscription_id = data.get("subscription_id")
+    period = None
 
     if subscription_id is not None:
-        subscription_exists = db.session.query(
-            db.session.query(Subscription).filter_by(subscription_id=subscription_id).exists()
-        ).scalar()
+        period = db.session.query(Subscription.period).filter_by(subscription_id=subscription_id).scalar()
         
-        if not subscription_exists:
-            logging.error(f"subscription_id {subscription_id} does not exist")
+        if period is None:
+            logger.error("subscription_id %s does not exist", subscription_id)
             return jsonify({"msg": f"subscription_id {subscription_id} does not exist"}), 400
         
     
     if 'sub_purchase_date' in data and data['sub_purchase_date'] is not None:
         try:
-            data['sub_purchase_date'] = datetime.strptime(data['sub_purchase_date'], '%Y-%m-%d')
+            data['sub_purchase_date'] = datetime.strptime(data['sub_purchase_date'], '%Y-%m-%d').date()
         except ValueError:
-            logging.error("Invalid date format for sub_purchase_date")
+            logger.error("Invalid date format for sub_purchase_date")
             return jsonify({"msg": "sub_purchase_date must be in the format 'YYYY-MM-DD'"}), 400
         
     try:
@@ -58,21 +73,22 @@ def add_customer():
             last_name=data['last_name'],
             address=data['address'],
             phone_number=data['phone_number'],
-            sub_purchase_date=data.get('sub_purchase_date')
+            sub_purchase_date=data.get('sub_purchase_date'),
+            sub_expiry_date=subscription_expiry_date(data.get('sub_purchase_date'), period)
         )
 
         db.session.add(new_customer)
         db.session.commit()
 
-        logging.info(f"Customer added successfully")
+        logger.info("Customer added successfully")
 
         return jsonify({"msg": "Customer added successfully"}), 201
 
     except Exception as e:
         db.session.rollback()
 
-        logging.error(f"An error occurred while adding a customer: {str(e)}")
-        logging.error(f"An error occurred: {str(e)}")
+        logger.error("An error occurred while adding a customer: %s", e)
+        logger.error("An error occurred: %s", e)
 
         return jsonify({"msg": "An internal error occurred"}), 500
 
@@ -83,38 +99,53 @@ def update_customer(customer_id):
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for updating a customer")
+        logger.error("No data provided for updating a customer")
         return jsonify({"msg": "No data provided"}), 400
 
     customer = Customer.query.get(customer_id)
     if not customer:
-        logging.warning(f"Customer with ID {customer_id} does not exist")
+        logger.warning("Customer with ID %s does not exist", customer_id)
         return jsonify({"msg": "Customer does not exist"}), 404
 
     allowed_fields = {'subscription_id', 'first_name', 'last_name', 'address', 'phone_number', 'sub_purchase_date'}
 
-    for key, value in data.items():
+    for key in data:
         if key not in allowed_fields:
-            logging.error(f"Field '{key}' is not allowed for update")
+            logger.error("Field '%s' is not allowed for update", key)
             return jsonify({"msg": f"Field '{key}' is not allowed for update"}), 400
-        
-        setattr(customer, key, value)
 
     if 'sub_purchase_date' in data and data['sub_purchase_date'] is not None:
         try:
-            data['sub_purchase_date'] = datetime.strptime(data['sub_purchase_date'], '%Y-%m-%d')
+            data['sub_purchase_date'] = datetime.strptime(data['sub_purchase_date'], '%Y-%m-%d').date()
         except ValueError:
-            logging.error("Invalid date format for sub_purchase_date")
+            logger.error("Invalid date format for sub_purchase_date")
             return jsonify({"msg": "sub_purchase_date must be in the format 'YYYY-MM-DD'"}), 400
+
+    for key, value in data.items():
+        setattr(customer, key, value)
+
+    if 'subscription_id' in data or 'sub_purchase_date' in data:
+        subscription_id = customer.subscription_id
+        period = None
+
+        if subscription_id is not None:
+            period = db.session.query(Subscription.period).filter_by(subscription_id=subscription_id).scalar()
+
+            if period is None:
+                db.session.rollback()
+                logger.error("subscription_id %s does not exist", subscription_id)
+                return jsonify({"msg": f"subscription_id {subscription_id} does not exist"}), 400
+
+        customer.sub_expiry_date = subscription_expiry_date(customer.sub_purchase_date, period)
         
     try:
         db.session.commit()
-        logging.info(f"Customer updated successfully: ID {customer_id}")
+        logger.info("Customer updated successfully: ID %s", customer_id)
         return jsonify({"msg": "Customer updated successfully"}), 200
     
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred while updating a customer: {str(e)}")
+        logger.error("An error occurred while updating a customer: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -125,97 +156,146 @@ def delete_customer(customer_id):
         customer = Customer.query.get(customer_id)
 
         if not customer:
-            logging.warning(f"Customer with ID {customer_id} does not exist")
+            logger.warning("Customer with ID %s does not exist", customer_id)
             return jsonify({"msg": "Customer does not exist"}), 404
 
         db.session.delete(customer)
         db.session.commit()
 
-        logging.info(f"Customer deleted successfully: ID {customer_id}")
+        logger.info("Customer deleted successfully: ID %s", customer_id)
         return jsonify({"msg": "Customer deleted successfully"}), 200
     
     except Exception as e:
         db.session.rollback()
         
-        logging.error(f"An error occurred while deleting a customer: {str(e)}")
+        logger.error("An error occurred while deleting a customer: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
 @customer_routes.route('/get_customer/<int:customer_id>', methods=['GET'])
 @role_required(["manager", "receptionist", "coach"])
 def get_customer(customer_id):
-    customer = Customer.query.get(customer_id)
-    if not customer:
-        logging.warning(f"Customer with ID {customer_id} does not exist")
+    result = fetch_one(CUSTOMER_FIELDS, Customer.customer_id == customer_id)
+    if not result:
+        logger.warning("Customer with ID %s does not exist", customer_id)
         return jsonify({"msg": "Customer does not exist"}), 404
 
-    result = {
-        "customer_id": customer.customer_id,
-        "subscription_id": customer.subscription_id,
-        "first_name": customer.first_name,
-        "last_name": customer.last_name,
-        "address": customer.address,
-        "phone_number": customer.phone_number,
-        "sub_purchase_date": str(customer.sub_purchase_date),  
-    }
-    logging.info(f"Customer retrieved successfully: ID {customer_id}")
-    return jsonify(result), 200
+    logger.info("Customer retrieved successfully: ID %s", customer_id)
+    return json_response(result)
 
 
 @customer_routes.route('/check_sub_validity/<int:customer_id>', methods=['GET'])
 @role_required(["manager", "receptionist"])
 def check_sub_validity(customer_id):
-    customer = Customer.query.get(customer_id)
+    row = db.session.execute(
+        select(Customer.subscription_id, Customer.sub_expiry_date).where(Customer.customer_id == customer_id)
+    ).first()
 
-    if not customer:
-        logging.warning(f"Customer with ID {customer_id} does not exist")
+    if not row:
+        logger.warning("Customer with ID %s does not exist", customer_id)
         return jsonify({"msg": "Customer does not exist"}), 404
-    
-    today = date.today()
-
-    if customer.subscription_id == None:
-        logging.warning(f"Subscription is null")
-        return jsonify({"msg": "Customer doesn't have purchased subscription"}), 404
-    
-    subscription = Subscription.query.filter_by(subscription_id=customer.subscription_id).first()
 
-    if not subscription:
-        logging.warning(f"Subscription with ID {customer.subscription_id} does not exist")
-        return jsonify({"msg": "Subscription does not exist"}), 404
+    subscription_id, expiry_date = row
 
-    period_days = int(subscription.period)
-    expiry_date = customer.sub_purchase_date + timedelta(days=period_days)
+    if subscription_id is None or expiry_date is None:
+        logger.warning("Subscription is null")
+        return jsonify({"msg": "Customer doesn't have purchased subscription"}), 404
 
-    if today <= expiry_date:
-        logging.info(f"Subscription is valid for customer ID {customer_id}")
+    if date.today() <= expiry_date:
+        logger.info("Subscription is valid for customer ID %s", customer_id)
         return jsonify({'msg': 'Subscription is valid'}), 200
     else:
-        logging.info(f"Subscription expired for customer ID {customer_id}")
+        logger.info("Subscription expired for customer ID %s", customer_id)
         return jsonify({'msg': 'Subscription is no longer valid'}), 401
- 
-    
-@customer_routes.route('/get_all_customers', methods=['GET'])
-@role_required(["manager", "receptionist", "coach"])
-def get_all_customers():
+
+
+@customer_routes.route('/check_subs_validity', methods=['POST'])
+@role_required(["manager", "receptionist"])
+def check_subs_validity():
+    data = request.get_json()
+
+    if not data or 'customer_ids' not in data:
+        logger.error("No customer IDs provided for validity check")
+        return jsonify({"msg": "Field 'customer_ids' is required"}), 400
+
+    customer_ids = data['customer_ids']
+
+    if not isinstance(customer_ids, list) or not all(isinstance(customer_id, int) for customer_id in customer_ids):
+        logger.error("Invalid customer_ids provided")
+        return jsonify({"msg": "customer_ids must be a list of integers"}), 400
+
+    if len(customer_ids) > MAX_BULK_VALIDITY_CHECK:
+        logger.error("Too many customers in validity check: %s", len(customer_ids))
+        return jsonify({"msg": f"At most {MAX_BULK_VALIDITY_CHECK} customers can be checked at once"}), 400
+
     try:
-        limit = request.args.get('limit', 5, type=int)
-        offset = request.args.get('offset', 0, type=int)
+        expiry_dates = dict(db.session.execute(
+            select(Customer.customer_id, Customer.sub_expiry_date).where(Customer.customer_id.in_(customer_ids))
+        ).all())
 
-        customers = Customer.query.order_by(Customer.customer_id).limit(limit).offset(offset).all()
+        today = date.today()
         result = [
             {
-                "customer_id": customer.customer_id,
-                "subscription_id": customer.subscription_id,
-                "first_name": customer.first_name,
-                "last_name": customer.last_name,
-                "address": customer.address,
-                "phone_number": customer.phone_number,
-                "sub_purchase_date": str(customer.sub_purchase_date),
+                "customer_id": customer_id,
+                "exists": customer_id in expiry_dates,
+                "valid": expiry_dates.get(customer_id) is not None and today <= expiry_dates[customer_id],
+                "sub_expiry_date": str(expiry_dates[customer_id]) if expiry_dates.get(customer_id) else None,
             }
-            for customer in customers
+            for customer_id in dict.fromkeys(customer_ids)
         ]
-        logging.info("All customers retrieved successfully")
+        logger.info("Subscription validity checked for %s customers", len(result))
         return jsonify(result), 200
+
+    except Exception as e:
+        logger.error("An error occurred while checking subscription validity: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
+ 
+    
+@customer_routes.route('/get_all_customers', methods=['GET'])
+@role_required(["manager", "receptionist", "coach"])
+def get_all_customers():
+    try:
+        response = paginate(CUSTOMER_FIELDS, Customer.customer_id)
+        logger.info("All customers retrieved successfully")
+        return response
     except Exception as e:
-        logging.error(f"An error occurred while retrieving all customers: {str(e)}")
-        return jsonify({"msg": "An internal error occurred"}), 500
\ No newline at end of file
+        logger.error("An error occurred while retrieving all customers: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
+
+
+@customer_routes.route('/export_customers', methods=['GET'])
+@role_required(["manager", "receptionist"])
+def export_customers():
+    try:
+        response = export_rows(CUSTOMER_FIELDS, Customer.customer_id, 'customers')
+        logger.info("Customers export started")
+        return response
+    except Exception as e:
+        logger.error("An error occurred while exporting customers: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
+
+
+@customer_routes.route('/import_customers', methods=['POST'])
+@role_required(["manager", "receptionist"])
+def import_customers():
+    upload = request.files.get('file')
+
+    if not upload:
+        logger.error("No file provided for importing customers")
+        return jsonify({"msg": "A 'file' upload is required"}), 400
+
+    import_format = importers.detect_format(upload.filename, request.args.get('format'))
+
+    if not import_format:
+        logger.error("Invalid import format provided")
+        return jsonify({"msg": f"format must be one of: {', '.join(importers.IMPORT_FORMATS)}"}), 400
+
+    try:
+        summary = importers.import_customers(upload.stream, import_format)
+        logger.info("Imported %s customers, %s rows failed", summary['imported'], summary['failed'])
+        return jsonify(summary), 200
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error("An error occurred while importing customers: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
@@ -1,14 +1,26 @@
 from flask import Blueprint, request, jsonify
-from app.models import Employee, GymClass
+from app.models import Employee, GymClass, Schedule
 from app import db
+from app.passwords import hash_password, PasswordPoolSaturated
 import logging
-from utils import role_required, check_gym_mismatch
+from app.serialization import fetch_one, json_response
+from app.timetable import invalidate_timetable
+from utils import role_required, paginate, check_gym_mismatch, revoke_employee_tokens
 from flask_jwt_extended import get_jwt
 
 employee_routes = Blueprint('employee_routes', __name__)
+logger = logging.getLogger(__name__)
 
 ALLOWED_ROLES = ["manager", "receptionist", "coach"]
 
+EMPLOYEE_FIELDS = (
+    ("employee_id", Employee.employee_id, None),
+    ("gym_id", Employee.gym_id, None),
+    ("first_name", Employee.first_name, None),
+    ("last_name", Employee.last_name, None),
+    ("role", Employee.role, None),
+)
+
 
 @employee_routes.route('/update_employee/<int:employee_id>', methods=['PUT'])
 @role_required(["manager"])
@@ -16,54 +28,63 @@ def update_employee(employee_id):
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for updating an employee")
+        logger.error("No data provided for updating an employee")
         return jsonify({"msg": "No data provided"}), 400
     
     employee = Employee.query.get(employee_id)
 
     if not employee:
-        logging.warning(f"Employee with ID {employee_id} does not exist")
+        logger.warning("Employee with ID %s does not exist", employee_id)
         return jsonify({"msg": "Employee does not exist"}), 404
 
     allowed_fields = {'password', 'first_name', 'last_name', 'role'}
-    
-    # Check if the role is being changed from 'coach' to another role
-    if 'role' in data and data['role'] != employee.role and employee.role == 'coach':
-        try:
-            gym_classes = GymClass.query.filter_by(employee_id=employee_id).all()
-            for gym_class in gym_classes:
-                gym_class.employee_id = None  # Remove the employee as the coach
-            db.session.commit()
-            logging.info(f"Employee {employee_id} removed from all gym classes they were coaching")
-        except Exception as e:
-            db.session.rollback()
-            logging.error(f"An error occurred while removing employee {employee_id} from gym classes: {str(e)}")
-            return jsonify({"msg": "An internal error occurred while updating gym classes"}), 500
+
+    stops_coaching = 'role' in data and data['role'] != employee.role and employee.role == 'coach'
 
     for key, value in data.items():
         if key not in allowed_fields:
-            logging.error(f"Field '{key}' is not allowed for update")
+            logger.error("Field '%s' is not allowed for update", key)
             return jsonify({"msg": f"Field '{key}' is not allowed for update"}), 400
 
         if key == 'password' and len(value) < 8:
-            logging.warning("Password length validation failed")
+            logger.warning("Password length validation failed")
             return jsonify({"msg": "Password must be at least 8 characters long"}), 400
 
         if key == 'role' and value not in ALLOWED_ROLES:
-            logging.error(f"Invalid role provided: {value}")
+            logger.error("Invalid role provided: %s", value)
             return jsonify({"msg": f"Invalid role. Allowed roles are: {', '.join(ALLOWED_ROLES)}"}), 400
 
         setattr(employee, key, value)
 
     try:
+        if 'password' in data:
+            employee.password = hash_password(data['password'])
+    except PasswordPoolSaturated:
+        db.session.rollback()
+        logger.warning("Password hashing pool is saturated, rejecting employee update")
+        return jsonify({"msg": "Server is busy, try again later"}), 503
+
+    try:
+        if stops_coaching:
+            # Remove the employee as the coach of their classes, committed together with the role change
+            GymClass.query.filter_by(employee_id=employee_id).update({GymClass.employee_id: None}, synchronize_session=False)
+
+        if 'role' in data or 'password' in data:
+            revoke_employee_tokens(employee_id)
+
+        invalidate_timetable(employee.gym_id)
         db.session.commit()
-        logging.info(f"Employee updated successfully: ID {employee_id}")
+
+        if stops_coaching:
+            logger.info("Employee %s removed from all gym classes they were coaching", employee_id)
+
+        logger.info("Employee updated successfully: ID %s", employee_id)
 
         return jsonify({"msg": "Employee updated successfully"}), 200
 
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred while updating an employee: {str(e)}")
+        logger.error("An error occurred while updating an employee: %s", e)
 
         return jsonify({"msg": "An internal error occurred"}), 500
 
@@ -75,43 +96,45 @@ def delete_employee(employee_id):
     try:
         employee = Employee.query.get(employee_id)
         if not employee:
-            logging.warning(f"Employee with ID {employee_id} does not exist")
+            logger.warning("Employee with ID %s does not exist", employee_id)
             return jsonify({"msg": "Employee does not exist"}), 404
         
         jwt_payload = get_jwt()
         user_gym_id = jwt_payload.get('gym_id')
 
         if user_gym_id != employee.gym_id:
-            logging.warning("You are not authorized to modify this gym")
+            logger.warning("You are not authorized to modify this gym")
             return jsonify({"msg": "You are not authorized to modify this gym"}), 403
         
-        db.session.delete(employee)
+        # One UPDATE per dependent table and a bulk DELETE, all in one transaction. Deleting the
+        # Employee instance through the session would load its schedules and classes to detach them.
+        for model in (Schedule, GymClass):
+            model.query.filter_by(employee_id=employee_id).update({model.employee_id: None}, synchronize_session=False)
+
+        # Also drops this worker's cached token version, other workers notice the missing row
+        # once theirs expires
+        revoke_employee_tokens(employee_id)
+        Employee.query.filter_by(employee_id=employee_id).delete(synchronize_session=False)
+        invalidate_timetable(user_gym_id)
         db.session.commit()
-        logging.info(f"Employee deleted successfully: ID {employee_id}")
+        logger.info("Employee deleted successfully: ID %s", employee_id)
         return jsonify({"msg": "Employee deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred while deleting an employee: {str(e)}")
+        logger.error("An error occurred while deleting an employee: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
 @employee_routes.route('/get_employee/<int:employee_id>', methods=['GET'])
 @role_required(["manager"])
 def get_employee(employee_id):
-    employee = Employee.query.get(employee_id)
-    if not employee:
-        logging.warning(f"Employee with ID {employee_id} does not exist")
+    result = fetch_one(EMPLOYEE_FIELDS, Employee.employee_id == employee_id)
+    if not result:
+        logger.warning("Employee with ID %s does not exist", employee_id)
         return jsonify({"msg": "Employee does not exist"}), 404
-    
-    result = {
-        "employee_id": employee.employee_id,
-        "gym_id": employee.gym_id,
-        "first_name": employee.first_name,
-        "last_name": employee.last_name,
-        "role": employee.role,
-    }
-    logging.info(f"Employee retrieved successfully: ID {employee_id}")
-    return jsonify(result), 200
+
+    logger.info("Employee retrieved successfully: ID %s", employee_id)
+    return json_response(result)
 
 
 @employee_routes.route('/get_all_employees', methods=['GET'])
@@ -119,23 +142,9 @@ def get_employee(employee_id):
 def get_all_employees():
     try:
 
-        limit = request.args.get('limit', 5, type=int)
-        offset = request.args.get('offset', 0, type=int)
-
-        employees = Employee.query.order_by(Employee.employee_id).limit(limit).offset(offset).all()
-        
-        result = [
-            {
-                "employee_id": employee.employee_id,
-                "gym_id": employee.gym_id,
-                "first_name": employee.first_name,
-                "last_name": employee.last_name,
-                "role": employee.role,
-            }
-            for employee in employees
-        ]
-        logging.info("All employees retrieved successfully")
-        return jsonify(result), 200
+        response = paginate(EMPLOYEE_FIELDS, Employee.employee_id)
+        logger.info("All employees retrieved successfully")
+        return response
     except Exception as e:
-        logging.error(f"An error occurred while retrieving all employees: {str(e)}")
+        logger.error("An error occurred while retrieving all employees: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
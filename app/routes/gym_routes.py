@@ -1,11 +1,20 @@
-from flask import Blueprint, request, jsonify
-from app.models import Gym, Employee, Product, GymClass, Schedule
+from flask import Blueprint, request, jsonify, current_app
+from app.models import Gym, Employee, Product, GymClass, Schedule, Sale
 from app import db
 import logging
-from utils import role_required
+from app.serialization import fetch_one, json_response
+from app.timetable import get_timetable
+from utils import role_required, paginate
 from flask_jwt_extended import get_jwt
 
 gym_routes = Blueprint('gym_routes', __name__)
+logger = logging.getLogger(__name__)
+
+GYM_FIELDS = (
+    ("gym_id", Gym.gym_id, None),
+    ("name", Gym.name, None),
+    ("address", Gym.address, None),
+)
 
 
 @gym_routes.route('/add_gym', methods=['POST'])
@@ -14,22 +23,22 @@ def add_gym():
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for adding gym")
+        logger.error("No data provided for adding gym")
         return jsonify({"msg": "No data provided"}), 400
 
     required_fields = {'name', 'address'}
 
     for field in required_fields:
         if field not in data:
-            logging.error(f"Missing required field: {field}")
+            logger.error("Missing required field: %s", field)
             return jsonify({"msg": f"Field '{field}' is required"}), 400
 
     if not isinstance(data['name'], str) or len(data['name']) < 2:
-        logging.warning("Invalid name provided")
+        logger.warning("Invalid name provided")
         return jsonify({"msg": "name must be a valid string with at least 2 characters"}), 400
     
     if not isinstance(data['address'], str) or len(data['address']) < 5:
-        logging.warning("Invalid address provided")
+        logger.warning("Invalid address provided")
         return jsonify({"msg": "address must be a valid string with at least 5 characters"}), 400
 
     try:
@@ -41,12 +50,12 @@ def add_gym():
         db.session.add(new_gym)
         db.session.commit()
 
-        logging.info(f"Gym added successfully")
+        logger.info("Gym added successfully")
         return jsonify({"msg": "Gym added successfully"}), 201
     
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred while adding gym: {str(e)}")
+        logger.error("An error occurred while adding gym: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -56,35 +65,35 @@ def update_gym(gym_id):
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for updating gym")
+        logger.error("No data provided for updating gym")
         return jsonify({"msg": "No data provided"}), 400
 
     gym = Gym.query.get(gym_id)
     if not gym:
-        logging.warning(f"Gym with ID {gym_id} does not exist")
+        logger.warning("Gym with ID %s does not exist", gym_id)
         return jsonify({"msg": "Gym does not exist"}), 404
 
     jwt_payload = get_jwt()
     user_gym_id = jwt_payload.get('gym_id')
 
     if user_gym_id != data['gym_id']:
-        logging.warning("You are not authorized to modify this gym")
+        logger.warning("You are not authorized to modify this gym")
         return jsonify({"msg": "You are not authorized to modify this gym"}), 403
     
     allowed_fields = {'name', 'address'}
     for key, value in data.items():
         if key not in allowed_fields:
-            logging.error(f"Field '{key}' is not allowed for update")
+            logger.error("Field '%s' is not allowed for update", key)
             return jsonify({"msg": f"Field '{key}' is not allowed for update"}), 400
         setattr(gym, key, value)
 
     try:
         db.session.commit()
-        logging.info(f"Gym {gym_id} updated successfully")
+        logger.info("Gym %s updated successfully", gym_id)
         return jsonify({"msg": "Gym updated successfully"}), 200
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred while updating gym {gym_id}: {str(e)}")
+        logger.error("An error occurred while updating gym %s: %s", gym_id, e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -94,28 +103,28 @@ def delete_gym(gym_id):
     try:
         gym = Gym.query.get(gym_id)
         if not gym:
-            logging.warning(f"Gym with ID {gym_id} does not exist")
+            logger.warning("Gym with ID %s does not exist", gym_id)
             return jsonify({"msg": "Gym does not exist"}), 404
 
         jwt_payload = get_jwt()
         user_gym_id = jwt_payload.get('gym_id')
 
         if user_gym_id != gym.gym_id:
-            logging.warning("You are not authorized to modify this gym")
+            logger.warning("You are not authorized to modify this gym")
             return jsonify({"msg": "You are not authorized to modify this gym"}), 403
     
-        Employee.query.filter_by(gym_id=gym_id).update({Employee.gym_id: None})
-        Product.query.filter_by(gym_id=gym_id).update({Product.gym_id: None})
-        GymClass.query.filter_by(gym_id=gym_id).update({GymClass.gym_id: None})
-        Schedule.query.filter_by(gym_id=gym_id).update({Schedule.gym_id: None})
+        # One UPDATE per dependent table and a bulk DELETE, all in one transaction. Deleting the
+        # Gym instance through the session would load every related collection to detach it.
+        for model in (Employee, Product, GymClass, Schedule, Sale):
+            model.query.filter_by(gym_id=gym_id).update({model.gym_id: None}, synchronize_session=False)
 
-        db.session.delete(gym)
+        Gym.query.filter_by(gym_id=gym_id).delete(synchronize_session=False)
         db.session.commit()
-        logging.info(f"Gym {gym_id} deleted successfully")
+        logger.info("Gym %s deleted successfully", gym_id)
         return jsonify({"msg": "Gym deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred while deleting gym {gym_id}: {str(e)}")
+        logger.error("An error occurred while deleting gym %s: %s", gym_id, e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -123,20 +132,15 @@ def delete_gym(gym_id):
 @role_required(["manager", "receptionist", "coach"])
 def get_gym(gym_id):
     try:
-        gym = Gym.query.get(gym_id)
-        if not gym:
-            logging.warning(f"Gym with ID {gym_id} does not exist")
+        result = fetch_one(GYM_FIELDS, Gym.gym_id == gym_id)
+        if not result:
+            logger.warning("Gym with ID %s does not exist", gym_id)
             return jsonify({"msg": "Gym does not exist"}), 404
 
-        result = {
-            "gym_id": gym.gym_id,
-            "name": gym.name,
-            "address": gym.address,
-        }
-        logging.info(f"Gym retrieved successfully: ID {gym_id}")
-        return jsonify(result), 200
+        logger.info("Gym retrieved successfully: ID %s", gym_id)
+        return json_response(result)
     except Exception as e:
-        logging.error(f"An error occurred while retrieving gym: {str(e)}")
+        logger.error("An error occurred while retrieving gym: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -144,19 +148,27 @@ def get_gym(gym_id):
 @role_required(["manager", "receptionist", "coach"])
 def get_all_gyms():
     try:
-        limit = request.args.get('limit', 5, type=int)
-        offset = request.args.get('offset', 0, type=int)
-
-        gyms = Gym.query.order_by(Gym.gym_id).limit(limit).offset(offset).all()
-        result = [
-            {
-                "gym_id": gym.gym_id,
-                "name": gym.name,
-                "address": gym.address,
-            } for gym in gyms
-        ]
-        logging.info("All gyms retrieved successfully")
-        return jsonify(result), 200
+        response = paginate(GYM_FIELDS, Gym.gym_id)
+        logger.info("All gyms retrieved successfully")
+        return response
     except Exception as e:
-        logging.error(f"An error occurred while retrieving all gyms: {str(e)}")
-        return jsonify({"msg": "An internal error occurred"}), 500
\ No newline at end of file
+        logger.error("An error occurred while retrieving all gyms: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
+
+@gym_routes.route('/gyms/<int:gym_id>/timetable', methods=['GET'])
+@role_required(["manager", "receptionist", "coach"])
+def get_gym_timetable(gym_id):
+    jwt_payload = get_jwt()
+    user_gym_id = jwt_payload.get('gym_id')
+
+    if user_gym_id != gym_id:
+        logger.warning("You are not authorized to view this gym")
+        return jsonify({"msg": "You are not authorized to view this gym"}), 403
+
+    try:
+        body = get_timetable(gym_id)
+        logger.info("Timetable retrieved successfully for gym %s", gym_id)
+        return current_app.response_class(body, mimetype='application/json')
+    except Exception as e:
+        logger.error("An error occurred while retrieving the timetable of gym %s: %s", gym_id, e)
+        return jsonify({"msg": "An internal error occurred"}), 500
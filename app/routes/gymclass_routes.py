@@ -1,11 +1,30 @@
 from flask import Blueprint, request, jsonify
-from app.models import GymClass, Employee, Gym, Customer, CustomerGymClass
+from app.models import GymClass, Employee, Gym, Customer, CustomerGymClass, DAYS, MINUTES_PER_DAY, day_number, day_name, parse_time, minute_of_week, time_of_minute, format_minute
 from app import db
+from sqlalchemy import delete, insert, select, update, or_, and_, tuple_
+from sqlalchemy.exc import IntegrityError
 import logging
-from datetime import datetime
 from flask_jwt_extended import get_jwt
-from utils import role_required
+from app.serialization import fetch_one, json_response, columns, rows_to_dicts
+from app.timetable import invalidate_timetable
+from utils import role_required, paginate, export_rows, encode_cursor, decode_cursor
 gymclass_routes = Blueprint('gymclass_routes', __name__)
+logger = logging.getLogger(__name__)
+
+MAX_BULK_ENROLLMENT = 500
+MAX_SEARCH_PAGE = 1000
+SEARCH_FLAGS = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+
+GYMCLASS_FIELDS = (
+    ("gymclass_id", GymClass.gymclass_id, None),
+    ("employee_id", GymClass.employee_id, None),
+    ("gym_id", GymClass.gym_id, None),
+    ("name", GymClass.name, None),
+    ("max_people", GymClass.max_people, None),
+    ("time", GymClass.minute_of_week, format_minute),
+    ("day_otw", GymClass.day_otw, day_name),
+    ("signed_people", GymClass.signed_people, None),
+)
 
 
 @gymclass_routes.route('/add_gymclass', methods=['POST'])
@@ -14,40 +33,46 @@ def add_gymclass():
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for adding gym class")
+        logger.error("No data provided for adding gym class")
         return jsonify({"msg": "No data provided"}), 400
 
     required_fields = {'employee_id', 'gym_id', 'name', 'max_people', 'time', 'day_otw', 'signed_people'}
 
     for field in required_fields:
         if field not in data:
-            logging.error(f"Missing required field: {field}")
+            logger.error("Missing required field: %s", field)
             return jsonify({"msg": f"Field '{field}' is required"}), 400
     
     jwt_payload = get_jwt()
     user_gym_id = jwt_payload.get('gym_id')
 
     if user_gym_id != data['gym_id']:
-        logging.warning("You are not authorized to modify this gym")
+        logger.warning("You are not authorized to modify this gym")
         return jsonify({"msg": "You are not authorized to modify this gym"}), 403
     
     try:
-        is_time_valid = datetime.strptime(data['time'], "%H:%M")
+        class_time = parse_time(data['time'])
     except ValueError:
-        logging.error("Time has to be in format HH:MM")
+        logger.error("Time has to be in format HH:MM")
         return jsonify({"msg": "Wrong time format (HH:MM expected)"}), 400
+
+    try:
+        day = day_number(data['day_otw'])
+    except ValueError:
+        logger.error("Invalid day_otw provided: %s", data['day_otw'])
+        return jsonify({"msg": f"day_otw must be one of {', '.join(DAYS)}"}), 400
         
     try:
         employee = Employee.query.get(data['employee_id'])
 
         if not employee:
-            logging.warning(f"Employee with ID {data['employee_id']} does not exist")
+            logger.warning("Employee with ID %s does not exist", data['employee_id'])
             return jsonify({"msg": "Employee does not exist"}), 404
 
         gym = Gym.query.get(data['gym_id'])
 
         if not gym:
-            logging.warning(f"Gym with ID {data['gym_id']} does not exist")
+            logger.warning("Gym with ID %s does not exist", data['gym_id'])
             return jsonify({"msg": "Gym does not exist"}), 404
 
         new_gymclass = GymClass(
@@ -55,21 +80,22 @@ def add_gymclass():
             gym_id=data['gym_id'],
             name=data['name'],
             max_people=data['max_people'],
-            time=data['time'],
-            day_otw=data['day_otw'],
+            minute_of_week=minute_of_week(day, class_time),
+            day_otw=day,
             signed_people=data['signed_people']
         )
 
         db.session.add(new_gymclass)
+        invalidate_timetable(data['gym_id'])
         db.session.commit()
 
-        logging.info(f"Gym class added successfully")
+        logger.info("Gym class added successfully")
         return jsonify({"msg": "Gym class added successfully"}), 201
 
     except Exception as e:
         db.session.rollback()
 
-        logging.error(f"An error occurred while adding gym class: {str(e)}")
+        logger.error("An error occurred while adding gym class: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -79,29 +105,47 @@ def update_gymclass(gymclass_id):
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for updating gym class")
+        logger.error("No data provided for updating gym class")
         return jsonify({"msg": "No data provided"}), 400
 
     gymclass = GymClass.query.get(gymclass_id)
     if not gymclass:
-        logging.warning(f"Gym class with ID {gymclass_id} does not exist")
+        logger.warning("Gym class with ID %s does not exist", gymclass_id)
         return jsonify({"msg": "Gym class does not exist"}), 404
 
     allowed_fields = {'employee_id', 'name', 'max_people', 'time', 'day_otw', 'signed_people'}
-    for key, value in data.items():
+    for key in data:
         if key not in allowed_fields:
-            logging.warning(f"Field '{key}' is not allowed for update")
+            logger.warning("Field '%s' is not allowed for update", key)
             return jsonify({"msg": f"Field '{key}' is not allowed for update"}), 400
 
-        setattr(gymclass, key, value)
+    try:
+        class_time = parse_time(data['time']) if 'time' in data else time_of_minute(gymclass.minute_of_week)
+    except ValueError:
+        logger.error("Time has to be in format HH:MM")
+        return jsonify({"msg": "Wrong time format (HH:MM expected)"}), 400
+
+    try:
+        day = day_number(data['day_otw']) if 'day_otw' in data else gymclass.day_otw
+    except ValueError:
+        logger.error("Invalid day_otw provided: %s", data['day_otw'])
+        return jsonify({"msg": f"day_otw must be one of {', '.join(DAYS)}"}), 400
+
+    for key, value in data.items():
+        if key not in ('time', 'day_otw'):
+            setattr(gymclass, key, value)
+
+    gymclass.day_otw = day
+    gymclass.minute_of_week = minute_of_week(day, class_time)
 
     try:
+        invalidate_timetable(gymclass.gym_id)
         db.session.commit()
-        logging.info(f"Gym class updated successfully: ID {gymclass_id}")
+        logger.info("Gym class updated successfully: ID %s", gymclass_id)
         return jsonify({"msg": "Gym class updated successfully"}), 200
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred while updating gym class: {str(e)}")
+        logger.error("An error occurred while updating gym class: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -115,21 +159,22 @@ def delete_gymclass(gymclass_id):
         user_gym_id = jwt_payload.get('gym_id')
 
         if user_gym_id != gymclass.gym_id:
-            logging.warning("You are not authorized to modify this gym")
+            logger.warning("You are not authorized to modify this gym")
             return jsonify({"msg": "You are not authorized to modify this gym"}), 403
     
         if not gymclass:
-            logging.warning(f"Gym class with ID {gymclass_id} does not exist")
+            logger.warning("Gym class with ID %s does not exist", gymclass_id)
             return jsonify({"msg": "Gym class does not exist"}), 404
 
         db.session.delete(gymclass)
+        invalidate_timetable(user_gym_id)
         db.session.commit()
-        logging.info(f"Gym class deleted successfully: ID {gymclass_id}")
+        logger.info("Gym class deleted successfully: ID %s", gymclass_id)
         return jsonify({"msg": "Gym class deleted successfully"}), 200
 
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred while deleting gym class: {str(e)}")
+        logger.error("An error occurred while deleting gym class: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -137,25 +182,14 @@ def delete_gymclass(gymclass_id):
 @role_required(["manager", "receptionist", "coach"])
 def get_gymclass(gymclass_id):
     try:
-        gymclass = GymClass.query.get(gymclass_id)
-        if not gymclass:
-            logging.warning(f"Gym class with ID {gymclass_id} does not exist")
+        result = fetch_one(GYMCLASS_FIELDS, GymClass.gymclass_id == gymclass_id)
+        if not result:
+            logger.warning("Gym class with ID %s does not exist", gymclass_id)
             return jsonify({"msg": "Gym class does not exist"}), 404
-
-        result = {
-            "gymclass_id": gymclass.gymclass_id,
-            "employee_id": gymclass.employee_id,
-            "gym_id": gymclass.gym_id,
-            "name": gymclass.name,
-            "max_people": gymclass.max_people,
-            "time": str(gymclass.time),
-            "day_otw": gymclass.day_otw,
-            "signed_people": gymclass.signed_people,
-        }
-        logging.info(f"Gym class retrieved successfully: ID {gymclass_id}")
-        return jsonify(result), 200
+        logger.info("Gym class retrieved successfully: ID %s", gymclass_id)
+        return json_response(result)
     except Exception as e:
-        logging.error(f"An error occurred while retrieving gym class: {str(e)}")
+        logger.error("An error occurred while retrieving gym class: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -165,53 +199,198 @@ def enroll_customer(gymclass_id):
     data = request.get_json()
 
     if 'customerID' not in data:
-        logging.warning("Customer ID is required for enrollment")
+        logger.warning("Customer ID is required for enrollment")
         return jsonify({"msg": "Customer ID is required"}), 400
 
     customer_id = data['customerID']
 
+    jwt_payload = get_jwt()
+    user_gym_id = jwt_payload.get('gym_id')
+
+    try:
+        # The unique constraint on (customer_id, gymclass_id) rejects duplicates, and the
+        # conditional UPDATE only takes a spot while one is free, so concurrent enrollments
+        # can't oversell the class.
+        db.session.add(CustomerGymClass(customer_id=customer_id, gymclass_id=gymclass_id))
+        db.session.flush()
+
+        reserved = db.session.execute(
+            update(GymClass)
+            .where(
+                GymClass.gymclass_id == gymclass_id,
+                GymClass.gym_id == user_gym_id,
+                GymClass.signed_people < GymClass.max_people,
+                select(Customer.customer_id).where(Customer.customer_id == customer_id).exists()
+            )
+            .values(signed_people=GymClass.signed_people + 1)
+            .returning(GymClass.gymclass_id)
+        ).first()
+
+        if reserved:
+            db.session.commit()
+            logger.info("Customer ID %s enrolled successfully in gym class ID %s", customer_id, gymclass_id)
+            return jsonify({"msg": "Customer enrolled successfully"}), 201
+
+        db.session.rollback()
+
+    except IntegrityError:
+        db.session.rollback()
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error("An error occurred during enrollment: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
+
+    return enrollment_failure(customer_id, gymclass_id, user_gym_id)
+
+
+def enrollment_failure(customer_id, gymclass_id, user_gym_id):
+    """
+    Works out why an enrollment was rejected. Only runs on the failure path, so successful
+    enrollments stay at one INSERT and one UPDATE.
+    """
     customer = Customer.query.get(customer_id)
 
     if not customer:
-        logging.warning(f"Customer with ID {customer_id} does not exist")
+        logger.warning("Customer with ID %s does not exist", customer_id)
         return jsonify({"msg": "Customer does not exist"}), 404
 
     gym_class = GymClass.query.get(gymclass_id)
 
     if not gym_class:
-        logging.warning(f"Gym class with ID {gymclass_id} does not exist")
+        logger.warning("Gym class with ID %s does not exist", gymclass_id)
         return jsonify({"msg": "Gym class does not exist"}), 404
 
-    jwt_payload = get_jwt()
-    user_gym_id = jwt_payload.get('gym_id')
-
-    if user_gym_id !=  gym_class.gym_id:
-        logging.warning("You are not authorized to modify this gym")
+    if user_gym_id != gym_class.gym_id:
+        logger.warning("You are not authorized to modify this gym")
         return jsonify({"msg": "You are not authorized to modify this gym"}), 403
-    
-    if gym_class.signed_people >= gym_class.max_people:
-        logging.warning(f"Gym class ID {gymclass_id} is full")
-        return jsonify({"msg": "No available spots in this class"}), 400
 
     existing_enrollment = CustomerGymClass.query.filter_by(customer_id=customer_id, gymclass_id=gymclass_id).first()
-    
+
     if existing_enrollment:
-        logging.warning(f"Customer ID {customer_id} is already enrolled in gym class ID {gymclass_id}")
+        logger.warning("Customer ID %s is already enrolled in gym class ID %s", customer_id, gymclass_id)
         return jsonify({"msg": "Customer already enrolled in this class"}), 400
 
+    logger.warning("Gym class ID %s is full", gymclass_id)
+    return jsonify({"msg": "No available spots in this class"}), 400
+
+
+@gymclass_routes.route('/enroll_customers/<int:gymclass_id>', methods=['POST'])
+@role_required(["manager", "receptionist", "coach"])
+def enroll_customers(gymclass_id):
+    data = request.get_json()
+
+    if not data or 'customer_ids' not in data:
+        logger.warning("Customer IDs are required for bulk enrollment")
+        return jsonify({"msg": "Field 'customer_ids' is required"}), 400
+
+    customer_ids = data['customer_ids']
+    partial = data.get('partial', False)
+
+    # bool is a subclass of int, so true/false have to be excluded explicitly
+    if not isinstance(customer_ids, list) or not all(
+        isinstance(customer_id, int) and not isinstance(customer_id, bool) for customer_id in customer_ids
+    ):
+        logger.error("Invalid customer_ids provided")
+        return jsonify({"msg": "customer_ids must be a list of integers"}), 400
+
+    if not isinstance(partial, bool):
+        logger.error("Invalid partial value provided")
+        return jsonify({"msg": "partial must be true or false"}), 400
+
+    if len(customer_ids) > MAX_BULK_ENROLLMENT:
+        logger.error("Too many customers in bulk enrollment: %s", len(customer_ids))
+        return jsonify({"msg": f"At most {MAX_BULK_ENROLLMENT} customers can be enrolled at once"}), 400
+
+    gym_class = GymClass.query.get(gymclass_id)
+
+    if not gym_class:
+        logger.warning("Gym class with ID %s does not exist", gymclass_id)
+        return jsonify({"msg": "Gym class does not exist"}), 404
+
+    jwt_payload = get_jwt()
+    user_gym_id = jwt_payload.get('gym_id')
+
+    if user_gym_id != gym_class.gym_id:
+        logger.warning("You are not authorized to modify this gym")
+        return jsonify({"msg": "You are not authorized to modify this gym"}), 403
+
     try:
-        new_enrollment = CustomerGymClass(customer_id=customer_id, gymclass_id=gymclass_id)
-        gym_class.signed_people += 1
-        db.session.add(new_enrollment)
+        existing_customers = set(db.session.scalars(
+            select(Customer.customer_id).where(Customer.customer_id.in_(customer_ids))
+        ))
+        already_enrolled = set(db.session.scalars(
+            select(CustomerGymClass.customer_id).where(
+                CustomerGymClass.gymclass_id == gymclass_id,
+                CustomerGymClass.customer_id.in_(customer_ids)
+            )
+        ))
+
+        outcomes = {}
+        candidates = []
+
+        for customer_id in customer_ids:
+            if customer_id in outcomes:
+                continue
+            if customer_id not in existing_customers:
+                outcomes[customer_id] = "customer_not_found"
+            elif customer_id in already_enrolled:
+                outcomes[customer_id] = "already_enrolled"
+            else:
+                outcomes[customer_id] = "class_full"
+                candidates.append(customer_id)
+
+        requested = len(candidates)
+
+        if partial and candidates:
+            # Lock the class row so the free spot count can't change before the UPDATE
+            free_spots = db.session.scalar(
+                select(GymClass.max_people - GymClass.signed_people)
+                .where(GymClass.gymclass_id == gymclass_id)
+                .with_for_update()
+            )
+            candidates = candidates[:max(free_spots, 0)]
+
+        # Reserves all spots at once, the WHERE clause still guards against overselling
+        # on databases that ignore FOR UPDATE
+        reserved = candidates and db.session.execute(
+            update(GymClass)
+            .where(
+                GymClass.gymclass_id == gymclass_id,
+                GymClass.signed_people + len(candidates) <= GymClass.max_people
+            )
+            .values(signed_people=GymClass.signed_people + len(candidates))
+            .returning(GymClass.gymclass_id)
+        ).first()
+
+        if reserved:
+            db.session.execute(
+                insert(CustomerGymClass),
+                [{"customer_id": customer_id, "gymclass_id": gymclass_id} for customer_id in candidates]
+            )
+            for customer_id in candidates:
+                outcomes[customer_id] = "enrolled"
+
         db.session.commit()
-        logging.info(f"Customer ID {customer_id} enrolled successfully in gym class ID {gymclass_id}")
-        return jsonify({"msg": "Customer enrolled successfully"}), 201
+
+    except IntegrityError:
+        db.session.rollback()
+        logger.warning("Concurrent enrollment detected for gym class ID %s, batch rolled back", gymclass_id)
+        return jsonify({"msg": "Enrollments changed during the request, try again"}), 409
 
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred during enrollment: {str(e)}")
+        logger.error("An error occurred during bulk enrollment: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
+    enrolled = len(candidates) if reserved else 0
+    logger.info("%s of %s eligible customers enrolled in gym class ID %s", enrolled, requested, gymclass_id)
+
+    return jsonify({
+        "enrolled": enrolled,
+        "results": [{"customer_id": customer_id, "status": status} for customer_id, status in outcomes.items()]
+    }), 200
+
 
 @gymclass_routes.route('/unenroll_customer/<int:gymclass_id>', methods=['POST'])
 @role_required(["manager", "receptionist", "coach"])
@@ -219,35 +398,50 @@ def unenroll_customer(gymclass_id):
     data = request.get_json()
 
     if 'customer_id' not in data:
-        logging.warning("Customer ID is required for unenrollment")
+        logger.warning("Customer ID is required for unenrollment")
         return jsonify({"msg": "Customer ID is required"}), 400
 
     customer_id = data['customer_id']
 
-    enrollment = CustomerGymClass.query.filter_by(customer_id=customer_id, gymclass_id=gymclass_id).first()
-    if not enrollment:
-        logging.warning(f"Customer ID {customer_id} is not enrolled in gym class ID {gymclass_id}")
-        return jsonify({"msg": "Customer is not enrolled in this class"}), 404
+    jwt_payload = get_jwt()
+    user_gym_id = jwt_payload.get('gym_id')
 
     try:
-        gym_class = GymClass.query.get(gymclass_id)
+        # Delete the enrollment and give its spot back in one transaction, the decrement is done
+        # by the database so it can't overwrite a concurrent enrollment's increment
+        unenrolled = db.session.execute(
+            delete(CustomerGymClass).where(
+                CustomerGymClass.customer_id == customer_id,
+                CustomerGymClass.gymclass_id == gymclass_id,
+                select(GymClass.gymclass_id).where(
+                    GymClass.gymclass_id == gymclass_id,
+                    GymClass.gym_id == user_gym_id
+                ).exists()
+            )
+        ).rowcount
+
+        if unenrolled:
+            db.session.execute(
+                update(GymClass)
+                .where(GymClass.gymclass_id == gymclass_id, GymClass.signed_people > 0)
+                .values(signed_people=GymClass.signed_people - 1)
+            )
+            db.session.commit()
+            logger.info("Customer ID %s unenrolled successfully from gym class ID %s", customer_id, gymclass_id)
+            return jsonify({"msg": "Customer unenrolled successfully"}), 200
 
-        jwt_payload = get_jwt()
-        user_gym_id = jwt_payload.get('gym_id')
+        db.session.rollback()
 
-        if user_gym_id != gym_class.gym_id:
-            logging.warning("You are not authorized to modify this gym")
-            return jsonify({"msg": "You are not authorized to modify this gym"}), 403
-    
-        gym_class.signed_people -= 1
-        db.session.delete(enrollment)
-        db.session.commit()
-        logging.info(f"Customer ID {customer_id} unenrolled successfully from gym class ID {gymclass_id}")
-        return jsonify({"msg": "Customer unenrolled successfully"}), 200
+        if not CustomerGymClass.query.filter_by(customer_id=customer_id, gymclass_id=gymclass_id).first():
+            logger.warning("Customer ID %s is not enrolled in gym class ID %s", customer_id, gymclass_id)
+            return jsonify({"msg": "Customer is not enrolled in this class"}), 404
+
+        logger.warning("You are not authorized to modify this gym")
+        return jsonify({"msg": "You are not authorized to modify this gym"}), 403
 
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred during unenrollment: {str(e)}")
+        logger.error("An error occurred during unenrollment: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -255,26 +449,123 @@ def unenroll_customer(gymclass_id):
 @role_required(["manager", "receptionist", "coach"])
 def get_all_gymclasses():
     try:
-        limit = request.args.get('limit', 5, type=int)
-        offset = request.args.get('offset', 0, type=int)
+        response = paginate(GYMCLASS_FIELDS, GymClass.gymclass_id)
+        logger.info("All gym classes retrieved successfully")
+        return response
+    except Exception as e:
+        logger.error("An error occurred while retrieving all gym classes: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
+
+
+def parse_search_cursor(value):
+    minute, gymclass_id = value.split(',')
+    return int(minute), int(gymclass_id)
+
+
+@gymclass_routes.route('/search_gymclasses', methods=['GET'])
+@role_required(["manager", "receptionist", "coach"])
+def search_gymclasses():
+    jwt_payload = get_jwt()
+    user_gym_id = jwt_payload.get('gym_id')
+
+    # Malformed values are rejected rather than dropped, a lost filter would widen the results
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        limit = None
 
-        gymclasses = GymClass.query.order_by(GymClass.gymclass_id).limit(limit).offset(offset).all()
-        
-        result = [
-            {
-                "gymclass_id": gymclass.gymclass_id,
-                "employee_id": gymclass.employee_id,
-                "gym_id": gymclass.gym_id,
-                "name": gymclass.name,
-                "max_people": gymclass.max_people,
-                "time": str(gymclass.time),
-                "day_otw": gymclass.day_otw,
-                "signed_people": gymclass.signed_people,
-            }
-            for gymclass in gymclasses
+    if limit is None or not 0 < limit <= MAX_SEARCH_PAGE:
+        logger.error("Invalid limit value")
+        return jsonify({"msg": f"limit must be between 1 and {MAX_SEARCH_PAGE}"}), 400
+
+    try:
+        coach_id = int(request.args['coach']) if 'coach' in request.args else None
+    except ValueError:
+        logger.error("Invalid coach provided: %s", request.args['coach'])
+        return jsonify({"msg": "coach must be an employee ID"}), 400
+
+    available = request.args.get('available', 'false').lower()
+
+    if available not in SEARCH_FLAGS:
+        logger.error("Invalid available value: %s", available)
+        return jsonify({"msg": "available must be true or false"}), 400
+
+    available = SEARCH_FLAGS[available]
+
+    try:
+        days = sorted({day_number(day) for day in request.args['days'].split(',')}) if 'days' in request.args else range(len(DAYS))
+    except ValueError:
+        logger.error("Invalid days provided: %s", request.args.get('days'))
+        return jsonify({"msg": f"days must be a comma separated list of {', '.join(DAYS)}"}), 400
+
+    try:
+        window_start = minute_of_week(0, parse_time(request.args['from'])) if 'from' in request.args else 0
+        window_end = minute_of_week(0, parse_time(request.args['to'])) if 'to' in request.args else MINUTES_PER_DAY
+    except ValueError:
+        logger.error("Time has to be in format HH:MM")
+        return jsonify({"msg": "Wrong time format (HH:MM expected)"}), 400
+
+    if window_end <= window_start:
+        logger.error("Search window end must be after its start")
+        return jsonify({"msg": "to must be after from"}), 400
+
+    try:
+        last = decode_cursor(request.args.get('cursor'), parse=parse_search_cursor)
+    except ValueError:
+        logger.warning("Invalid pagination cursor provided")
+        return jsonify({"msg": "Invalid cursor"}), 400
+
+    try:
+        # One range of minute_of_week per day, each a range scan on the (gym_id[, employee_id],
+        # minute_of_week, gymclass_id) indexes
+        criteria = [
+            GymClass.gym_id == user_gym_id,
+            or_(*(
+                and_(
+                    GymClass.minute_of_week >= day * MINUTES_PER_DAY + window_start,
+                    GymClass.minute_of_week < day * MINUTES_PER_DAY + window_end
+                )
+                for day in days
+            )),
         ]
-        logging.info("All gym classes retrieved successfully")
-        return jsonify(result), 200
+
+        if coach_id is not None:
+            criteria.append(GymClass.employee_id == coach_id)
+
+        if available:
+            criteria.append(GymClass.signed_people < GymClass.max_people)
+
+        if last is not None:
+            criteria.append(tuple_(GymClass.minute_of_week, GymClass.gymclass_id) > tuple_(*last))
+
+        rows = db.session.execute(
+            select(*columns(GYMCLASS_FIELDS))
+            .where(*criteria)
+            .order_by(GymClass.minute_of_week, GymClass.gymclass_id)
+            .limit(limit + 1)
+        ).all()
+
+        next_cursor = None
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(f"{rows[-1].minute_of_week},{rows[-1].gymclass_id}")
+
+        logger.info("Gym class search in gym %s returned %d classes", user_gym_id, len(rows))
+        return json_response({"items": rows_to_dicts(GYMCLASS_FIELDS, rows), "next_cursor": next_cursor})
+
     except Exception as e:
-        logging.error(f"An error occurred while retrieving all gym classes: {str(e)}")
-        return jsonify({"msg": "An internal error occurred"}), 500
\ No newline at end of file
+        logger.error("An error occurred while searching gym classes: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
+
+
+@gymclass_routes.route('/export_gymclasses', methods=['GET'])
+@role_required(["manager", "receptionist", "coach"])
+def export_gymclasses():
+    try:
+        response = export_rows(GYMCLASS_FIELDS, GymClass.gymclass_id, 'gymclasses')
+        logger.info("Gym classes export started")
+        return response
+    except Exception as e:
+        logger.error("An error occurred while exporting gym classes: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
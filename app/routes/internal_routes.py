@@ -0,0 +1,21 @@
+from flask import Blueprint, jsonify
+from app import db
+from app.pool import pool_stats
+import logging
+from utils import role_required
+
+internal_routes = Blueprint('internal_routes', __name__)
+logger = logging.getLogger(__name__)
+
+
+@internal_routes.route('/pool', methods=['GET'])
+@role_required(["manager"])
+def get_pool_stats():
+    try:
+        # Each worker process has its own pool, so this only describes the worker serving the request
+        result = pool_stats(db.engine)
+        logger.info("Connection pool stats retrieved successfully")
+        return jsonify(result), 200
+    except Exception as e:
+        logger.error("An error occurred while retrieving connection pool stats: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
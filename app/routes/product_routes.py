@@ -1,12 +1,28 @@
 from flask import Blueprint, request, jsonify
-from app.models import Product
-from app import db
+from app.models import Product, Sale, DailyRevenue, MonthlyRevenue
+from app import db, importers
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 import logging
-from decimal import Decimal
-from utils import role_required
+from datetime import datetime
+from app.serialization import fetch_one, json_response, as_float
+from utils import role_required, paginate, export_rows
 from flask_jwt_extended import get_jwt
 
 product_routes = Blueprint('product_routes', __name__)
+logger = logging.getLogger(__name__)
+
+MAX_BASKET_ITEMS = 100
+
+PRODUCT_FIELDS = (
+    ("product_id", Product.product_id, None),
+    ("gym_id", Product.gym_id, None),
+    ("name", Product.name, None),
+    ("quantity_in_stock", Product.quantity_in_stock, None),
+    ("quantity_sold", Product.quantity_sold, None),
+    ("price", Product.price, as_float),
+    ("total_revenue", Product.total_revenue, as_float),
+)
 
 
 @product_routes.route('/add_product', methods=['POST'])
@@ -15,21 +31,21 @@ def add_product():
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for adding a product")
+        logger.error("No data provided for adding a product")
         return jsonify({"msg": "No data provided"}), 400
 
     required_fields = {'gym_id', 'name', 'quantity_in_stock', 'quantity_sold', 'price', 'total_revenue'}
 
     for field in required_fields:
         if field not in data:
-            logging.error(f"Missing required field: {field}")
+            logger.error("Missing required field: %s", field)
             return jsonify({"msg": f"Field '{field}' is required"}), 400
         
     jwt_payload = get_jwt()
     user_gym_id = jwt_payload.get('gym_id')
 
     if user_gym_id != data['gym_id']:
-        logging.warning("You are not authorized to modify this gym")
+        logger.warning("You are not authorized to modify this gym")
         return jsonify({"msg": "You are not authorized to modify this gym"}), 403
 
     try:
@@ -44,13 +60,13 @@ def add_product():
         db.session.add(new_product)
         db.session.commit()
 
-        logging.info(f"Product added successfully")
+        logger.info("Product added successfully")
         return jsonify({"msg": "Product added successfully"}), 201
 
     except Exception as e:
         db.session.rollback()
 
-        logging.error(f"An error occurred while adding product: {str(e)}")
+        logger.error("An error occurred while adding product: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -60,33 +76,33 @@ def update_product(product_id):
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for updating a product")
+        logger.error("No data provided for updating a product")
         return jsonify({"msg": "No data provided"}), 400
 
     product = Product.query.get(product_id)
 
     if not product:
-        logging.error(f"Product with ID {product_id} does not exist")
+        logger.error("Product with ID %s does not exist", product_id)
         return jsonify({"msg": "Product does not exist"}), 404
 
     allowed_fields = {'name', 'quantity_in_stock', 'price', 'total_revenue'}
 
     for key, value in data.items():
         if key not in allowed_fields:
-            logging.error(f"Field '{key}' is not allowed for update")
+            logger.error("Field '%s' is not allowed for update", key)
             return jsonify({"msg": f"Field '{key}' is not allowed for update"}), 400
         setattr(product, key, value)
 
     try:
         db.session.commit()
 
-        logging.info(f"Product {product_id} updated successfully")
+        logger.info("Product %s updated successfully", product_id)
         return jsonify({"msg": "Product updated successfully"}), 200
 
     except Exception as e:
         db.session.rollback()
 
-        logging.error(f"An error occurred while updating product {product_id}: {str(e)}")
+        logger.error("An error occurred while updating product %s: %s", product_id, e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -96,24 +112,26 @@ def delete_product(product_id):
     try:
         product = Product.query.get(product_id)
         if not product:
-            logging.error(f"Product with ID {product_id} does not exist")
+            logger.error("Product with ID %s does not exist", product_id)
             return jsonify({"msg": "Product does not exist"}), 404
         
         jwt_payload = get_jwt()
         user_gym_id = jwt_payload.get('gym_id')
 
         if user_gym_id != product.gym_id:
-            logging.warning("You are not authorized to modify this gym")
+            logger.warning("You are not authorized to modify this gym")
             return jsonify({"msg": "You are not authorized to modify this gym"}), 403
 
+        Sale.query.filter_by(product_id=product_id).update({Sale.product_id: None})
+
         db.session.delete(product)
         db.session.commit()
-        logging.info(f"Product {product_id} deleted successfully")
+        logger.info("Product %s deleted successfully", product_id)
         return jsonify({"msg": "Product deleted successfully"}), 200
 
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred while deleting product {product_id}: {str(e)}")
+        logger.error("An error occurred while deleting product %s: %s", product_id, e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -121,94 +139,355 @@ def delete_product(product_id):
 @role_required(["manager", "receptionist"])
 def get_product(product_id):
     try:
-        product = Product.query.get(product_id)
-        if not product:
-            logging.error(f"Product with ID {product_id} does not exist")
+        result = fetch_one(PRODUCT_FIELDS, Product.product_id == product_id)
+        if not result:
+            logger.error("Product with ID %s does not exist", product_id)
             return jsonify({"msg": "Product does not exist"}), 404
 
-        result = {
-            "product_id": product.product_id,
-            "gym_id": product.gym_id,
-            "name": product.name,
-            "quantity_in_stock": product.quantity_in_stock,
-            "quantity_sold": product.quantity_sold,
-            "price": float(product.price),
-            "total_revenue": float(product.total_revenue),
-        }
-        logging.info(f"Product {product_id} retrieved successfully")
-        return jsonify(result), 200
+        logger.info("Product %s retrieved successfully", product_id)
+        return json_response(result)
 
     except Exception as e:
-        logging.error(f"An error occurred while retrieving product {product_id}: {str(e)}")
+        logger.error("An error occurred while retrieving product %s: %s", product_id, e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
+def sell_basket(quantities, user_gym_id):
+    """
+    Sells `quantities` ({product_id: quantity}) with a single conditional UPDATE.
+    Returns the sold (product_id, price) rows, or None when any product can't be sold,
+    in which case the caller has to roll back.
+    """
+    sold_quantity = case(quantities, value=Product.product_id)
+
+    sold = db.session.execute(
+        update(Product)
+        .where(
+            Product.product_id.in_(quantities),
+            Product.gym_id == user_gym_id,
+            Product.quantity_in_stock >= sold_quantity
+        )
+        .values(
+            quantity_in_stock=Product.quantity_in_stock - sold_quantity,
+            quantity_sold=func.coalesce(Product.quantity_sold, 0) + sold_quantity,
+            total_revenue=func.coalesce(Product.total_revenue, 0) + Product.price * sold_quantity
+        )
+        .returning(Product.product_id, Product.price)
+    ).all()
+
+    if len(sold) != len(quantities):
+        return None
+
+    record_sales(sold, quantities, user_gym_id)
+
+    return sold
+
+
+def record_sales(sold, quantities, gym_id):
+    """
+    Appends the sold rows to the Sale ledger and adds them to the daily and monthly rollups,
+    one multi-row statement each.
+    """
+    # One clock for the ledger and the rollups, so the rollups can be rebuilt from sold_at
+    sold_at = datetime.now()
+    today = sold_at.date()
+
+    sales = [
+        {
+            "product_id": product_id,
+            "gym_id": gym_id,
+            "quantity": quantities[product_id],
+            "unit_price": price,
+            "amount": price * quantities[product_id],
+            "sold_at": sold_at,
+        }
+        for product_id, price in sold
+    ]
+    db.session.execute(insert(Sale), sales)
+
+    for model, period_column, period_start in (
+        (DailyRevenue, DailyRevenue.day, today),
+        (MonthlyRevenue, MonthlyRevenue.month, today.replace(day=1)),
+    ):
+        rollups = [
+            {
+                period_column.key: period_start,
+                "gym_id": gym_id,
+                "product_id": sale["product_id"],
+                "quantity_sold": sale["quantity"],
+                "revenue": sale["amount"],
+            }
+            for sale in sales
+        ]
+        upsert_rollups(model, period_column, rollups)
+
+
+def upsert_rollups(model, period_column, rollups):
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        upsert = (postgresql if dialect == 'postgresql' else sqlite).insert(model).values(rollups)
+        db.session.execute(upsert.on_conflict_do_update(
+            index_elements=[period_column.key, 'gym_id', 'product_id'],
+            set_={
+                "quantity_sold": model.quantity_sold + upsert.excluded.quantity_sold,
+                "revenue": model.revenue + upsert.excluded.revenue,
+            }
+        ))
+        return
+
+    # Databases without ON CONFLICT fall back to one UPDATE, and an INSERT if needed, per row
+    for rollup in rollups:
+        updated = db.session.execute(
+            update(model)
+            .where(
+                period_column == rollup[period_column.key],
+                model.gym_id == rollup["gym_id"],
+                model.product_id == rollup["product_id"]
+            )
+            .values(
+                quantity_sold=model.quantity_sold + rollup["quantity_sold"],
+                revenue=model.revenue + rollup["revenue"]
+            )
+        )
+        if updated.rowcount == 0:
+            db.session.execute(insert(model).values(rollup))
+
+
+def sale_failure(quantities, user_gym_id):
+    products = {product.product_id: product for product in Product.query.filter(Product.product_id.in_(quantities))}
+
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+
+        if not product:
+            logger.error("Product with ID %s does not exist", product_id)
+            return jsonify({"msg": f"Product {product_id} does not exist"}), 404
+
+        if user_gym_id != product.gym_id:
+            logger.warning("You are not authorized to modify this gym")
+            return jsonify({"msg": "You are not authorized to modify this gym"}), 403
+
+        if product.quantity_in_stock < quantity:
+            logger.error("Not enough stock for Product %s", product_id)
+            return jsonify({"msg": f"Not enough stock available for product {product_id}"}), 400
+
+    # Stock changed between the UPDATE and this check
+    logger.warning("Stock changed while the sale was processed")
+    return jsonify({"msg": "Stock changed during the sale, try again"}), 409
+
+
 @product_routes.route('/sell_product/<int:product_id>', methods=['PUT'])
 @role_required(["manager", "receptionist"])
 def sell_product(product_id):
+    jwt_payload = get_jwt()
+    user_gym_id = jwt_payload.get('gym_id')
+
+    # Products of a deleted gym have no gym_id, a token without one must not match them
+    if user_gym_id is None:
+        logger.warning("You are not authorized to modify this gym")
+        return jsonify({"msg": "You are not authorized to modify this gym"}), 403
+
+    quantities = {product_id: 1}
+
+    try:
+        if sell_basket(quantities, user_gym_id):
+            db.session.commit()
+            logger.info("Product %s sold successfully", product_id)
+            return jsonify({"msg": "Product sold successfully"}), 200
+
+        db.session.rollback()
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error("An error occurred during product sale for Product %s: %s", product_id, e)
+        return jsonify({"msg": "An internal error occurred"}), 500
+
+    return sale_failure(quantities, user_gym_id)
+
+
+@product_routes.route('/sell_products', methods=['POST'])
+@role_required(["manager", "receptionist"])
+def sell_products():
     data = request.get_json()
 
-    product = Product.query.get(product_id)
-    quantity_sold = product.quantity_sold
+    if not data or 'items' not in data:
+        logger.error("No items provided for selling products")
+        return jsonify({"msg": "Field 'items' is required"}), 400
 
-    #if 'quantity_sold' not in data or not isinstance(data['quantity_sold'], int) or data['quantity_sold'] <= 0:
-    #    logging.error("Invalid 'quantity_sold' provided for selling a product")
-    #    return jsonify({"msg": "Valid 'quantity_sold' is required"}), 400
+    items = data['items']
 
-    
-    if not product:
-        logging.error(f"Product with ID {product_id} does not exist")
-        return jsonify({"msg": "Product does not exist"}), 404
+    if not isinstance(items, list) or not items or len(items) > MAX_BASKET_ITEMS:
+        logger.error("Invalid 'items' provided for selling products")
+        return jsonify({"msg": f"items must be a list of 1 to {MAX_BASKET_ITEMS} entries"}), 400
+
+    quantities = {}
+
+    for item in items:
+        if (
+            not isinstance(item, dict)
+            or not isinstance(item.get('product_id'), int)
+            or isinstance(item['product_id'], bool)
+            or not isinstance(item.get('quantity'), int)
+            or isinstance(item['quantity'], bool)
+            or item['quantity'] <= 0
+        ):
+            logger.error("Invalid basket item provided for selling products")
+            return jsonify({"msg": "Every item needs an integer product_id and a positive integer quantity"}), 400
+
+        quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
 
     jwt_payload = get_jwt()
     user_gym_id = jwt_payload.get('gym_id')
 
-    if user_gym_id != product.gym_id:
-        logging.warning("You are not authorized to modify this gym")
+    if user_gym_id is None:
+        logger.warning("You are not authorized to modify this gym")
         return jsonify({"msg": "You are not authorized to modify this gym"}), 403
-    
-    if product.quantity_in_stock < 1:
-        logging.error(f"Not enough stock for Product {product_id}")
-        return jsonify({"msg": "Not enough stock available"}), 400
 
     try:
-        product.quantity_in_stock -= 1
-        product.quantity_sold += 1
-        product.total_revenue += Decimal(product.price)
+        sold = sell_basket(quantities, user_gym_id)
+
+        if sold:
+            db.session.commit()
+
+            result = [
+                {
+                    "product_id": product_id,
+                    "quantity": quantities[product_id],
+                    "amount": float(price * quantities[product_id]),
+                }
+                for product_id, price in sold
+            ]
+            logger.info("Basket of %s products sold successfully", len(quantities))
+            return jsonify({
+                "msg": "Products sold successfully",
+                "items": result,
+                "total": float(sum(price * quantities[product_id] for product_id, price in sold)),
+            }), 200
 
-        db.session.commit()
-        logging.info(f"Product {product_id} sold successfully. Quantity: {quantity_sold}")
-        return jsonify({"msg": "Product sold successfully"}), 200
+        db.session.rollback()
 
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred during product sale for Product {product_id}: {str(e)}")
+        logger.error("An error occurred during basket sale: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
+    return sale_failure(quantities, user_gym_id)
+
+
+@product_routes.route('/revenue_report', methods=['GET'])
+@role_required(["manager"])
+def revenue_report():
+    jwt_payload = get_jwt()
+    user_gym_id = jwt_payload.get('gym_id')
+
+    period = request.args.get('period', 'daily')
+
+    if period not in ('daily', 'monthly'):
+        logger.error("Invalid revenue report period: %s", period)
+        return jsonify({"msg": "period must be 'daily' or 'monthly'"}), 400
+
+    model, period_column = (DailyRevenue, DailyRevenue.day) if period == 'daily' else (MonthlyRevenue, MonthlyRevenue.month)
 
-@product_routes.route('/get_all_products', methods=['GET'])
-@role_required(["manager", "receptionist"])
-def get_all_products():
     try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+        end = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+    except ValueError:
+        logger.error("Invalid date format for revenue report")
+        return jsonify({"msg": "start and end must be in the format 'YYYY-MM-DD'"}), 400
+
+    # A malformed filter is rejected rather than dropped, which would report every product
+    try:
+        product_id = int(request.args['product_id']) if 'product_id' in request.args else None
+    except ValueError:
+        logger.error("Invalid product_id for revenue report: %s", request.args['product_id'])
+        return jsonify({"msg": "product_id must be an integer"}), 400
+
+    try:
+        query = select(period_column, model.product_id, model.quantity_sold, model.revenue).where(model.gym_id == user_gym_id)
 
-        limit = request.args.get('limit', 5, type=int)
-        offset = request.args.get('offset', 0, type=int)
+        if start:
+            query = query.where(period_column >= (start if period == 'daily' else start.replace(day=1)))
+        if end:
+            query = query.where(period_column <= end)
+        if product_id is not None:
+            query = query.where(model.product_id == product_id)
+
+        rows = db.session.execute(query.order_by(period_column, model.product_id)).all()
 
-        products = Product.query.order_by(Product.product_id).limit(limit).offset(offset).all()
         result = [
             {
-                "product_id": product.product_id,
-                "gym_id": product.gym_id,
-                "name": product.name,
-                "quantity_in_stock": product.quantity_in_stock,
-                "quantity_sold": product.quantity_sold,
-                "price": float(product.price),
-                "total_revenue": float(product.total_revenue),
+                "period": str(period_start),
+                "product_id": row_product_id,
+                "quantity_sold": quantity_sold,
+                "revenue": float(revenue),
             }
-            for product in products
+            for period_start, row_product_id, quantity_sold, revenue in rows
         ]
-        logging.info("All products retrieved successfully")
-        return jsonify(result), 200
+        logger.info("%s revenue report for gym %s retrieved successfully", period.capitalize(), user_gym_id)
+        return jsonify({"rows": result, "total": float(sum(row[3] for row in rows))}), 200
+
+    except Exception as e:
+        logger.error("An error occurred while building the revenue report: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
+
+
+@product_routes.route('/get_all_products', methods=['GET'])
+@role_required(["manager", "receptionist"])
+def get_all_products():
+    try:
+
+        response = paginate(PRODUCT_FIELDS, Product.product_id)
+        logger.info("All products retrieved successfully")
+        return response
     except Exception as e:
-        logging.error(f"An error occurred while retrieving all products: {str(e)}")
+        logger.error("An error occurred while retrieving all products: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
+
+
+@product_routes.route('/export_products', methods=['GET'])
+@role_required(["manager", "receptionist"])
+def export_products():
+    try:
+        response = export_rows(PRODUCT_FIELDS, Product.product_id, 'products')
+        logger.info("Products export started")
+        return response
+    except Exception as e:
+        logger.error("An error occurred while exporting products: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
+
+
+@product_routes.route('/import_products', methods=['POST'])
+@role_required(["manager", "receptionist"])
+def import_products():
+    upload = request.files.get('file')
+
+    if not upload:
+        logger.error("No file provided for importing products")
+        return jsonify({"msg": "A 'file' upload is required"}), 400
+
+    import_format = importers.detect_format(upload.filename, request.args.get('format'))
+
+    if not import_format:
+        logger.error("Invalid import format provided")
+        return jsonify({"msg": f"format must be one of: {', '.join(importers.IMPORT_FORMATS)}"}), 400
+
+    jwt_payload = get_jwt()
+    user_gym_id = jwt_payload.get('gym_id')
+
+    # Without a gym claim every row would be checked against nothing, only the CLI imports for any gym
+    if user_gym_id is None:
+        logger.warning("You are not authorized to modify this gym")
+        return jsonify({"msg": "You are not authorized to modify this gym"}), 403
+
+    try:
+        summary = importers.import_products(upload.stream, import_format, user_gym_id)
+        logger.info("Imported %s products, %s rows failed", summary['imported'], summary['failed'])
+        return jsonify(summary), 200
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error("An error occurred while importing products: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
@@ -1,10 +1,25 @@
 from flask import Blueprint, request, jsonify
-from app.models import Schedule
+from app.models import Schedule, DAYS, day_number, day_name, parse_time, minute_of_week, time_of_minute, format_minute
 from app import db
 import logging
-from utils import role_required
+from app.serialization import fetch_one, json_response
+from app.timetable import invalidate_timetable
+from app.schedule_conflicts import coach_of, find_conflicts, week_conflicts
+from utils import role_required, paginate
 from flask_jwt_extended import get_jwt
 schedule_routes = Blueprint('schedule_routes', __name__)
+logger = logging.getLogger(__name__)
+
+SCHEDULE_FIELDS = (
+    ("schedule_id", Schedule.schedule_id, None),
+    ("gymclass_id", Schedule.gymclass_id, None),
+    ("gym_id", Schedule.gym_id, None),
+    ("employee_id", Schedule.employee_id, None),
+    ("day_otw", Schedule.day_otw, day_name),
+    ("start_time", Schedule.start_minute, format_minute),
+    ("end_time", Schedule.end_minute, format_minute),
+    ("entry_type", Schedule.entry_type, None),
+)
 
 
 @schedule_routes.route('/add_schedule', methods=['POST'])
@@ -13,52 +28,82 @@ def add_schedule():
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for adding a schedule")
+        logger.error("No data provided for adding a schedule")
         return jsonify({"msg": "No data provided"}), 400
 
     required_fields = {'gym_id', 'day_otw', 'start_time', 'end_time', 'entry_type'}
 
     for field in required_fields:
         if field not in data:
-            logging.error(f"Missing required field: {field}")
+            logger.error("Missing required field: %s", field)
             return jsonify({"msg": f"Field '{field}' is required"}), 400
 
     jwt_payload = get_jwt()
     user_gym_id = jwt_payload.get('gym_id')
 
     if user_gym_id != data['gym_id']:
-        logging.warning("You are not authorized to modify this gym")
+        logger.warning("You are not authorized to modify this gym")
         return jsonify({"msg": "You are not authorized to modify this gym"}), 403
     
     if 'employee_id' not in data and 'gymclass_id' not in data:
-        logging.error("Either employee_id or gymclass_id must be provided")
+        logger.error("Either employee_id or gymclass_id must be provided")
         return jsonify({"msg": "Either employee_id or gymclass_id must be provided"}), 400
     
     if 'employee_id' in data and 'gymclass_id' in data:
-        logging.error("Cannot enter both employee_id and gymclass_id as a schedule enetry")
+        logger.error("Cannot enter both employee_id and gymclass_id as a schedule enetry")
         return jsonify({"msg": "Cannot enter both employee_id and gymclass_id as a schedule enetry"}), 400
+
+    try:
+        day = day_number(data['day_otw'])
+    except ValueError:
+        logger.error("Invalid day_otw provided: %s", data['day_otw'])
+        return jsonify({"msg": f"day_otw must be one of {', '.join(DAYS)}"}), 400
+
+    try:
+        start_time = parse_time(data['start_time'])
+        end_time = parse_time(data['end_time'])
+    except ValueError:
+        logger.error("Time has to be in format HH:MM")
+        return jsonify({"msg": "Wrong time format (HH:MM expected)"}), 400
+
+    if end_time <= start_time:
+        logger.error("Schedule end time must be after its start time")
+        return jsonify({"msg": "end_time must be after start_time"}), 400
+
+    start_minute = minute_of_week(day, start_time)
+    end_minute = minute_of_week(day, end_time)
     
     try:
+        employee_id = data.get('employee_id') or coach_of(data.get('gymclass_id'))
+        conflicts = find_conflicts(data['gym_id'], employee_id, start_minute, end_minute)
+
+        if conflicts:
+            # Releases the employee lock taken by find_conflicts
+            db.session.rollback()
+            logger.warning("Schedule for employee %s on %s overlaps %d entries", employee_id, data['day_otw'], len(conflicts))
+            return jsonify({"msg": "Schedule overlaps existing entries", "conflicts": conflicts}), 409
+
         new_schedule = Schedule(
             gymclass_id=data.get('gymclass_id'),
             gym_id=data['gym_id'],
             employee_id=data.get('employee_id'),
-            day_otw=data['day_otw'],
-            start_time=data['start_time'],
-            end_time=data['end_time'],
+            day_otw=day,
+            start_minute=start_minute,
+            end_minute=end_minute,
             entry_type=data['entry_type']
         )
 
         db.session.add(new_schedule)
+        invalidate_timetable(data['gym_id'])
         db.session.commit()
 
-        logging.info(f"Schedule added successfully")
+        logger.info("Schedule added successfully")
         return jsonify({"msg": "Schedule added successfully"}), 201
 
     except Exception as e:
         db.session.rollback()
 
-        logging.error(f"An error occurred while adding schedule: {str(e)}")
+        logger.error("An error occurred while adding schedule: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -68,38 +113,73 @@ def update_schedule(schedule_id):
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for updating a schedule")
+        logger.error("No data provided for updating a schedule")
         return jsonify({"msg": "No data provided"}), 400
 
     schedule = Schedule.query.get(schedule_id)
 
     if not schedule:
-        logging.error(f"Schedule with ID {schedule_id} does not exist")
+        logger.error("Schedule with ID %s does not exist", schedule_id)
         return jsonify({"msg": "Schedule does not exist"}), 404
 
     if 'employee_id' in data and 'gymclass_id' in data:
-        logging.error("Cannot enter both employee_id and gymclass_id as a schedule enetry")
+        logger.error("Cannot enter both employee_id and gymclass_id as a schedule enetry")
         return jsonify({"msg": "Cannot enter both employee_id and gymclass_id as a schedule enetry"}), 400
     
     allowed_fields = {'gymclass_id', 'employee_id', 'day_otw', 'start_time', 'end_time', 'entry_type'}
 
-    for key, value in data.items():
+    for key in data:
         if key not in allowed_fields:
-            logging.error(f"Field '{key}' is not allowed for update")
+            logger.error("Field '%s' is not allowed for update", key)
             return jsonify({"msg": f"Field '{key}' is not allowed for update"}), 400
-        
-        setattr(schedule, key, value)
 
     try:
+        day = day_number(data['day_otw']) if 'day_otw' in data else schedule.day_otw
+    except ValueError:
+        logger.error("Invalid day_otw provided: %s", data['day_otw'])
+        return jsonify({"msg": f"day_otw must be one of {', '.join(DAYS)}"}), 400
+
+    try:
+        start_time = parse_time(data['start_time']) if 'start_time' in data else time_of_minute(schedule.start_minute)
+        end_time = parse_time(data['end_time']) if 'end_time' in data else time_of_minute(schedule.end_minute)
+    except ValueError:
+        logger.error("Time has to be in format HH:MM")
+        return jsonify({"msg": "Wrong time format (HH:MM expected)"}), 400
+
+    if end_time <= start_time:
+        logger.error("Schedule end time must be after its start time")
+        return jsonify({"msg": "end_time must be after start_time"}), 400
+
+    start_minute = minute_of_week(day, start_time)
+    end_minute = minute_of_week(day, end_time)
+
+    try:
+        employee_id = data.get('employee_id', schedule.employee_id) or coach_of(data.get('gymclass_id', schedule.gymclass_id))
+        conflicts = find_conflicts(schedule.gym_id, employee_id, start_minute, end_minute, exclude_id=schedule_id)
+
+        if conflicts:
+            db.session.rollback()
+            logger.warning("Schedule %s for employee %s on %s overlaps %d entries", schedule_id, employee_id, day_name(day), len(conflicts))
+            return jsonify({"msg": "Schedule overlaps existing entries", "conflicts": conflicts}), 409
+
+        for key in ('gymclass_id', 'employee_id', 'entry_type'):
+            if key in data:
+                setattr(schedule, key, data[key])
+
+        schedule.day_otw = day
+        schedule.start_minute = start_minute
+        schedule.end_minute = end_minute
+
+        invalidate_timetable(schedule.gym_id)
         db.session.commit()
 
-        logging.info(f"Schedule {schedule_id} updated successfully")
+        logger.info("Schedule %s updated successfully", schedule_id)
         return jsonify({"msg": "Schedule updated successfully"}), 200
     
     except Exception as e:
         db.session.rollback()
         
-        logging.error(f"An error occurred while updating schedule {schedule_id}: {str(e)}")
+        logger.error("An error occurred while updating schedule %s: %s", schedule_id, e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -109,25 +189,26 @@ def delete_schedule(schedule_id):
     try:
         schedule = Schedule.query.get(schedule_id)
         if not schedule:
-            logging.error(f"Schedule with ID {schedule_id} does not exist")
+            logger.error("Schedule with ID %s does not exist", schedule_id)
             return jsonify({"msg": "Schedule does not exist"}), 404
 
         jwt_payload = get_jwt()
         user_gym_id = jwt_payload.get('gym_id')
 
         if user_gym_id != schedule.gym_id:
-            logging.warning("You are not authorized to modify this gym")
+            logger.warning("You are not authorized to modify this gym")
             return jsonify({"msg": "You are not authorized to modify this gym"}), 403
     
         db.session.delete(schedule)
+        invalidate_timetable(user_gym_id)
         db.session.commit()
         
-        logging.info(f"Schedule {schedule_id} deleted successfully")
+        logger.info("Schedule %s deleted successfully", schedule_id)
         return jsonify({"msg": "Schedule deleted successfully"}), 200
 
     except Exception as e:
         db.session.rollback()
-        logging.error(f"An error occurred while deleting schedule {schedule_id}: {str(e)}")
+        logger.error("An error occurred while deleting schedule %s: %s", schedule_id, e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -136,24 +217,15 @@ def delete_schedule(schedule_id):
 def get_schedule(schedule_id):
     try:
         
-        schedule = Schedule.query.get(schedule_id)
-        if not schedule:
-            logging.error(f"Schedule with ID {schedule_id} does not exist")
+        result = fetch_one(SCHEDULE_FIELDS, Schedule.schedule_id == schedule_id)
+        if not result:
+            logger.error("Schedule with ID %s does not exist", schedule_id)
             return jsonify({"msg": "Schedule does not exist"}), 404
 
-        result = {
-            "schedule_id": schedule.schedule_id,
-            "gymclass_id": schedule.gymclass_id,
-            "gym_id": schedule.gym_id,
-            "employee_id": schedule.employee_id,
-            "day_otw": schedule.day_otw,
-            "start_time": str(schedule.start_time),
-            "end_time": str(schedule.end_time)
-        }
-        logging.info(f"Schedule {schedule_id} retrieved successfully")
-        return jsonify(result), 200
+        logger.info("Schedule %s retrieved successfully", schedule_id)
+        return json_response(result)
     except Exception as e:
-        logging.error(f"An error occurred while retrieving schedule {schedule_id}: {str(e)}")
+        logger.error("An error occurred while retrieving schedule %s: %s", schedule_id, e)
         return jsonify({"msg": "An internal error occurred"}), 500
     
 
@@ -164,26 +236,24 @@ def get_all_schedules():
         jwt_payload = get_jwt()
         user_gym_id = jwt_payload.get('gym_id')
         
-        limit = request.args.get('limit', 5, type=int)
-        offset = request.args.get('offset', 0, type=int)
-
-        schedules = Schedule.query.order_by(Schedule.schedule_id).filter_by(gym_id=user_gym_id).limit(limit).offset(offset).all()
-
-        result = [
-            {
-                "schedule_id": schedule.schedule_id,
-                "gymclass_id": schedule.gymclass_id,
-                "gym_id": schedule.gym_id,
-                "employee_id": schedule.employee_id,
-                "day_otw": schedule.day_otw,
-                "start_time": str(schedule.start_time),
-                "end_time": str(schedule.end_time),
-                "entry_type": schedule.entry_type,
-            }
-            for schedule in schedules
-        ]
-        logging.info("All schedules retrieved successfully")
-        return jsonify(result), 200
+        response = paginate(SCHEDULE_FIELDS, Schedule.schedule_id, Schedule.gym_id == user_gym_id)
+        logger.info("All schedules retrieved successfully")
+        return response
+    except Exception as e:
+        logger.error("An error occurred while retrieving all schedules: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
+
+
+@schedule_routes.route('/validate_schedules', methods=['GET'])
+@role_required(["manager", "receptionist", "coach"])
+def validate_schedules():
+    jwt_payload = get_jwt()
+    user_gym_id = jwt_payload.get('gym_id')
+
+    try:
+        conflicts = week_conflicts(user_gym_id)
+        logger.info("Found %d schedule conflicts in gym %s", len(conflicts), user_gym_id)
+        return json_response({"conflicts": conflicts})
     except Exception as e:
-        logging.error(f"An error occurred while retrieving all schedules: {str(e)}")
+        logger.error("An error occurred while validating schedules of gym %s: %s", user_gym_id, e)
         return jsonify({"msg": "An internal error occurred"}), 500
@@ -1,9 +1,22 @@
 from flask import Blueprint, request, jsonify
-from app.models import Subscription, Customer
+from app.models import Subscription, Customer, subscription_expiry_sql
 from app import db
+from sqlalchemy import select, tuple_
 import logging
-from utils import role_required
+from datetime import date, timedelta
+from app.serialization import fetch_one, json_response, as_float
+from utils import role_required, paginate, encode_cursor, decode_cursor
 subscription_routes = Blueprint('subscription_routes', __name__)
+logger = logging.getLogger(__name__)
+
+MAX_EXPIRING_PAGE = 1000
+
+SUBSCRIPTION_FIELDS = (
+    ("subscription_id", Subscription.subscription_id, None),
+    ("type", Subscription.type, None),
+    ("price", Subscription.price, as_float),
+    ("period", Subscription.period, None),
+)
 
 
 @subscription_routes.route('/add_subscription', methods=['POST'])
@@ -12,26 +25,26 @@ def add_subscription():
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for adding a subscription")
+        logger.error("No data provided for adding a subscription")
         return jsonify({"msg": "No data provided"}), 400
 
     required_fields = {'type', 'price', 'period'}
 
     for field in required_fields:
         if field not in data:
-            logging.error(f"Missing required field: {field}")
+            logger.error("Missing required field: %s", field)
             return jsonify({"msg": f"Field '{field}' is required"}), 400
 
     if not isinstance(data['price'], (float, int)) or data['price'] < 0:
-        logging.error("Invalid price value")
+        logger.error("Invalid price value")
         return jsonify({"msg": "price must be a positive number"}), 400
     
     if not isinstance(data['type'], str) or not data['type'].strip():
-        logging.error("Invalid type value")
+        logger.error("Invalid type value")
         return jsonify({"msg": "type must be a non-empty string"}), 400
     
     if not isinstance(data['period'], int) or data['period'] < 0:
-        logging.error("Invalid period value")
+        logger.error("Invalid period value")
         return jsonify({"msg": "period must be a non-negative integer"}), 400
 
     try:
@@ -44,13 +57,13 @@ def add_subscription():
         db.session.add(new_subscription)
         db.session.commit()
 
-        logging.info(f"Subscription added successfully")
+        logger.info("Subscription added successfully")
         return jsonify({"msg": "Subscription added successfully"}), 201
 
     except Exception as e:
         db.session.rollback()
 
-        logging.error(f"An error occurred while adding subscription: {str(e)}")
+        logger.error("An error occurred while adding subscription: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -60,33 +73,39 @@ def update_subscription(subscription_id):
     data = request.get_json()
 
     if not data:
-        logging.error("No data provided for updating a subscription")
+        logger.error("No data provided for updating a subscription")
         return jsonify({"msg": "No data provided"}), 400
 
     subscription = Subscription.query.get(subscription_id)
 
     if not subscription:
-        logging.warning(f"Subscription with ID {subscription_id} does not exist")
+        logger.warning("Subscription with ID %s does not exist", subscription_id)
         return jsonify({"msg": "Subscription does not exist"}), 404
 
     allowed_fields = {'type', 'price', 'period'}
 
     for key, value in data.items():
         if key not in allowed_fields:
-            logging.error(f"Field '{key}' is not allowed for update")
+            logger.error("Field '%s' is not allowed for update", key)
             return jsonify({"msg": f"Field '{key}' is not allowed for update"}), 400
         setattr(subscription, key, value)
 
     try:
+        if 'period' in data:
+            Customer.query.filter(
+                Customer.subscription_id == subscription_id,
+                Customer.sub_purchase_date.isnot(None)
+            ).update({Customer.sub_expiry_date: subscription_expiry_sql(data['period'])}, synchronize_session=False)
+
         db.session.commit()
 
-        logging.info(f"Subscription updated successfully: ID {subscription_id}")
+        logger.info("Subscription updated successfully: ID %s", subscription_id)
         return jsonify({"msg": "Subscription updated successfully"}), 200
     
     except Exception as e:
         db.session.rollback()
 
-        logging.error(f"An error occurred while updating subscription: {str(e)}")
+        logger.error("An error occurred while updating subscription: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -97,25 +116,22 @@ def delete_subscription(subscription_id):
         subscription = Subscription.query.get(subscription_id)
 
         if not subscription:
-            logging.warning(f"Subscription with ID {subscription_id} does not exist")
+            logger.warning("Subscription with ID %s does not exist", subscription_id)
             return jsonify({"msg": "Subscription does not exist"}), 404
 
-        customers_with_subscription = Customer.query.filter_by(subscription_id=subscription_id).all()
-        for customer in customers_with_subscription:
-            customer.subscription_id = None
-
-        db.session.commit()
-
-        db.session.delete(subscription)
+        Customer.query.filter_by(subscription_id=subscription_id).update(
+            {Customer.subscription_id: None, Customer.sub_expiry_date: None}, synchronize_session=False
+        )
+        Subscription.query.filter_by(subscription_id=subscription_id).delete(synchronize_session=False)
         db.session.commit()
 
-        logging.info(f"Subscription {subscription_id} and associated customer links cleared successfully")
+        logger.info("Subscription %s and associated customer links cleared successfully", subscription_id)
         return jsonify({"msg": "Subscription deleted successfully"}), 200
     
     except Exception as e:
         db.session.rollback()
 
-        logging.error(f"An error occurred while deleting subscription: {str(e)}")
+        logger.error("An error occurred while deleting subscription: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -123,24 +139,17 @@ def delete_subscription(subscription_id):
 @role_required(["manager", "receptionist", "coach"])
 def get_subscription(subscription_id):
     try:
-        subscription = Subscription.query.get(subscription_id)
+        result = fetch_one(SUBSCRIPTION_FIELDS, Subscription.subscription_id == subscription_id)
 
-        if not subscription:
-            logging.warning(f"Subscription with ID {subscription_id} does not exist")
+        if not result:
+            logger.warning("Subscription with ID %s does not exist", subscription_id)
             return jsonify({"msg": "Subscription does not exist"}), 404
 
-        result = {
-            "subscription_id": subscription.subscription_id,
-            "type": subscription.type,
-            "price": float(subscription.price),
-            "period": subscription.period
-        }
-
-        logging.info(f"Subscription retrieved successfully: ID {subscription_id}")
-        return jsonify(result), 200
+        logger.info("Subscription retrieved successfully: ID %s", subscription_id)
+        return json_response(result)
     
     except Exception as e:
-        logging.error(f"An error occurred while retrieving subscription: {str(e)}")
+        logger.error("An error occurred while retrieving subscription: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
 
 
@@ -148,22 +157,86 @@ def get_subscription(subscription_id):
 @role_required(["manager", "receptionist", "coach"])
 def get_all_subscriptions():
     try:
-        limit = request.args.get('limit', 5, type=int)
-        offset = request.args.get('offset', 0, type=int)
-        
-        subscriptions = Subscription.query.order_by(Subscription.subscription_id).limit(limit).offset(offset).all()
+        response = paginate(SUBSCRIPTION_FIELDS, Subscription.subscription_id)
+        logger.info("All subscriptions retrieved successfully")
+        return response
+    except Exception as e:
+        logger.error("An error occurred while retrieving all subscriptions: %s", e)
+        return jsonify({"msg": "An internal error occurred"}), 500
+
+
+def parse_expiry_cursor(value):
+    expiry_date, customer_id = value.split(',')
+    return date.fromisoformat(expiry_date), int(customer_id)
+
+
+@subscription_routes.route('/subscriptions/expiring', methods=['GET'])
+@role_required(["manager", "receptionist"])
+def get_expiring_subscriptions():
+    try:
+        within_days = int(request.args.get('within_days', 7))
+    except ValueError:
+        within_days = None
+
+    if within_days is None or within_days < 0:
+        logger.error("Invalid within_days value")
+        return jsonify({"msg": "within_days must be a non-negative integer"}), 400
+
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        limit = None
+
+    if limit is None or not 0 < limit <= MAX_EXPIRING_PAGE:
+        logger.error("Invalid limit value")
+        return jsonify({"msg": f"limit must be between 1 and {MAX_EXPIRING_PAGE}"}), 400
+
+    try:
+        last = decode_cursor(request.args.get('cursor'), parse=parse_expiry_cursor)
+    except ValueError:
+        logger.warning("Invalid pagination cursor provided")
+        return jsonify({"msg": "Invalid cursor"}), 400
+
+    today = date.today()
+
+    try:
+        # Walks ix_customer_sub_expiry_date_customer_id in order, so every page is a bounded range scan
+        query = select(
+            Customer.customer_id,
+            Customer.subscription_id,
+            Customer.first_name,
+            Customer.last_name,
+            Customer.phone_number,
+            Customer.sub_expiry_date
+        ).where(Customer.sub_expiry_date.between(today, today + timedelta(days=within_days)))
+
+        if last is not None:
+            query = query.where(tuple_(Customer.sub_expiry_date, Customer.customer_id) > tuple_(*last))
+
+        rows = db.session.execute(
+            query.order_by(Customer.sub_expiry_date, Customer.customer_id).limit(limit + 1)
+        ).all()
+
+        next_cursor = None
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(f"{rows[-1].sub_expiry_date.isoformat()},{rows[-1].customer_id}")
 
         result = [
             {
-                "subscription_id": subscription.subscription_id,
-                "type": subscription.type,
-                "price": float(subscription.price),
-                "period": subscription.period,
+                "customer_id": row.customer_id,
+                "subscription_id": row.subscription_id,
+                "first_name": row.first_name,
+                "last_name": row.last_name,
+                "phone_number": row.phone_number,
+                "sub_expiry_date": str(row.sub_expiry_date),
             }
-            for subscription in subscriptions
+            for row in rows
         ]
-        logging.info("All subscriptions retrieved successfully")
-        return jsonify(result), 200
+        logger.info("Subscriptions expiring within %s days retrieved successfully", within_days)
+        return jsonify({"items": result, "next_cursor": next_cursor}), 200
+
     except Exception as e:
-        logging.error(f"An error occurred while retrieving all subscriptions: {str(e)}")
+        logger.error("An error occurred while retrieving expiring subscriptions: %s", e)
         return jsonify({"msg": "An internal error occurred"}), 500
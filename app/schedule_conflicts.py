@@ -0,0 +1,79 @@
+from sqlalchemy import select, func
+from .models import Schedule, GymClass, Employee, MINUTES_PER_DAY, day_name, format_minute
+from . import db
+
+# Class entries are staffed by the class coach, other entries by their own employee
+schedule_employee_id = func.coalesce(Schedule.employee_id, GymClass.employee_id)
+
+
+def _entries(*criteria):
+    return db.session.execute(
+        select(Schedule.start_minute, Schedule.end_minute, Schedule.schedule_id, schedule_employee_id)
+        .outerjoin(GymClass, GymClass.gymclass_id == Schedule.gymclass_id)
+        .where(*criteria)
+        .order_by(Schedule.start_minute, Schedule.schedule_id)
+    ).all()
+
+
+def coach_of(gymclass_id):
+    return db.session.scalar(select(GymClass.employee_id).where(GymClass.gymclass_id == gymclass_id))
+
+
+def find_conflicts(gym_id, employee_id, start_minute, end_minute, exclude_id=None):
+    """
+    Schedule entries of the same employee that overlap [start, end). Locks the employee row
+    first, so concurrent writes for one employee are checked one after another; the caller
+    writes its entry in the same transaction.
+    """
+    if employee_id is None:
+        return []
+
+    db.session.execute(select(Employee.employee_id).where(Employee.employee_id == employee_id).with_for_update())
+
+    # Entries never cross midnight, so the day start bounds the scan of the (gym_id, start_minute) index
+    criteria = [
+        Schedule.gym_id == gym_id,
+        Schedule.start_minute >= start_minute - start_minute % MINUTES_PER_DAY,
+        Schedule.start_minute < end_minute,
+        Schedule.end_minute > start_minute,
+        schedule_employee_id == employee_id,
+    ]
+
+    if exclude_id is not None:
+        criteria.append(Schedule.schedule_id != exclude_id)
+
+    return [
+        {"schedule_id": schedule_id, "start_time": format_minute(entry_start), "end_time": format_minute(entry_end)}
+        for entry_start, entry_end, schedule_id, _ in _entries(*criteria)
+    ]
+
+
+def week_conflicts(gym_id):
+    """
+    Every pair of overlapping entries in a gym's week. One sorted pass over all entries: per
+    employee it keeps the entries still running at the current start, and each of them
+    conflicts with the entry that starts now. Minutes count from the start of the week, so
+    entries on different days never overlap.
+    """
+    active = {}
+    conflicts = []
+
+    for start, end, schedule_id, employee_id in _entries(Schedule.gym_id == gym_id):
+        if employee_id is None:
+            continue
+
+        running = [entry for entry in active.get(employee_id, ()) if entry[1] > start]
+
+        for other_start, other_end, other_id in running:
+            conflicts.append({
+                "day_otw": day_name(start // MINUTES_PER_DAY),
+                "employee_id": employee_id,
+                "schedule_ids": [other_id, schedule_id],
+                "overlap_start": format_minute(start),
+                "overlap_end": format_minute(min(end, other_end)),
+            })
+
+        running.append((start, end, schedule_id))
+        active[employee_id] = running
+
+    return conflicts
@@ -0,0 +1,70 @@
+from flask import current_app
+from sqlalchemy import select
+from decimal import Decimal
+from datetime import date, time
+from . import db
+
+try:
+    import orjson
+except ImportError: # Optional, the standard library encoder is used without it
+    orjson = None
+    import json
+
+
+# Read endpoints select only the columns they return and build dicts straight from the row tuples,
+# skipping ORM instances and the identity map.
+# A field is (output name, column, converter or None).
+
+
+def as_float(value):
+    return None if value is None else float(value)
+
+
+def as_str(value):
+    return None if value is None else str(value)
+
+
+def columns(fields):
+    return [column for _, column, _ in fields]
+
+
+def rows_to_dicts(fields, rows):
+    names = [name for name, _, _ in fields]
+    converters = [(index, convert) for index, (_, _, convert) in enumerate(fields) if convert is not None]
+
+    if not converters:
+        return [dict(zip(names, row)) for row in rows]
+
+    result = []
+    for row in rows:
+        values = list(row)
+        for index, convert in converters:
+            values[index] = convert(values[index])
+        result.append(dict(zip(names, values)))
+
+    return result
+
+
+def fetch_one(fields, *criteria):
+    row = db.session.execute(select(*columns(fields)).where(*criteria)).first()
+    return rows_to_dicts(fields, [row])[0] if row else None
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
+
+
+def export_value(value):
+    # Exports keep NULLs as null/empty instead of the 'None' strings of the legacy endpoints
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
@@ -0,0 +1,81 @@
+from sqlalchemy import select, update, func
+from threading import Lock
+from .models import Schedule, GymClass, Employee, Gym, DAYS, day_name, format_minute
+from .serialization import dumps
+from . import db
+
+# gym_id -> (timetable_version, encoded timetable), kept per process. Every write bumps the gym's
+# timetable_version in its own transaction, so each worker notices the change with one primary
+# key lookup before it serves a cached body.
+_cache = {}
+_cache_lock = Lock()
+
+
+def invalidate_timetable(gym_id):
+    """Marks the timetable of a gym as changed. Call it before committing the write."""
+    if gym_id is None:
+        return
+
+    db.session.execute(update(Gym).where(Gym.gym_id == gym_id).values(timetable_version=Gym.timetable_version + 1))
+
+    with _cache_lock:
+        _cache.pop(gym_id, None)
+
+
+def build_timetable(gym_id):
+    """
+    Loads every schedule entry of a gym with its class and employee in one query. The employee
+    is the one on the entry itself, or the class coach for class entries.
+    """
+    employee_id = func.coalesce(Schedule.employee_id, GymClass.employee_id)
+
+    rows = db.session.execute(
+        select(
+            Schedule.schedule_id, Schedule.day_otw, Schedule.start_minute, Schedule.end_minute, Schedule.entry_type,
+            GymClass.gymclass_id, GymClass.name, GymClass.max_people,
+            Employee.employee_id, Employee.first_name, Employee.last_name, Employee.role,
+        )
+        .outerjoin(GymClass, GymClass.gymclass_id == Schedule.gymclass_id)
+        .outerjoin(Employee, Employee.employee_id == employee_id)
+        .where(Schedule.gym_id == gym_id)
+        .order_by(Schedule.start_minute, Schedule.schedule_id)
+    ).all()
+
+    days = {day: [] for day in DAYS}
+
+    for (schedule_id, day_otw, start_minute, end_minute, entry_type,
+         gymclass_id, class_name, max_people,
+         employee_id, first_name, last_name, role) in rows:
+        days[day_name(day_otw)].append({
+            "schedule_id": schedule_id,
+            "start_time": format_minute(start_minute),
+            "end_time": format_minute(end_minute),
+            "entry_type": entry_type,
+            "gym_class": None if gymclass_id is None else {
+                "gymclass_id": gymclass_id, "name": class_name, "max_people": max_people,
+            },
+            "employee": None if employee_id is None else {
+                "employee_id": employee_id, "first_name": first_name, "last_name": last_name, "role": role,
+            },
+        })
+
+    return {"gym_id": gym_id, "days": days}
+
+
+def get_timetable(gym_id):
+    """Returns the encoded timetable of a gym, from the cache while the gym's version is unchanged."""
+    # Read before building: a write that commits in between leaves a newer version behind and
+    # the next request rebuilds
+    version = db.session.scalar(select(Gym.timetable_version).where(Gym.gym_id == gym_id))
+
+    cached = _cache.get(gym_id)
+    if cached and version is not None and cached[0] == version:
+        return cached[1]
+
+    body = dumps(build_timetable(gym_id))
+
+    if version is not None:
+        with _cache_lock:
+            _cache[gym_id] = (version, body)
+
+    return body
@@ -0,0 +1,212 @@
+"""
+Times the cascades behind delete_subscription, update_employee (coach changing role) and
+delete_gym with --rows dependent rows each, through the real routes. With --legacy the
+previous implementations (loading the dependent objects into the session and detaching them
+one by one, ORM deletes that load related collections) are timed on the same data first.
+
+    python benchmarks/cascades.py --rows 100000 --legacy
+
+Every scenario checks that no dependent row still points at the deleted or changed parent.
+Without DATABASE_URL a temporary SQLite file is used; with it, tables are dropped and
+recreated, so point it at a throwaway database.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date
+from time import perf_counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+if not os.getenv('DATABASE_URL'):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('BCRYPT_LOG_ROUNDS', '4')
+
+from sqlalchemy import func, insert, select
+from app import create_app, db
+from app.models import Customer, Employee, Gym, GymClass, Product, Sale, Schedule, Subscription
+
+PASSWORD = 'benchmark-password'
+
+
+def count(*criteria):
+    return db.session.scalar(select(func.count()).where(*criteria))
+
+
+def add_gym():
+    gym = Gym(name='Bench gym', address='Benchmark street 1')
+    db.session.add(gym)
+    db.session.commit()
+    return gym.gym_id
+
+
+def add_employee(gym_id, role):
+    employee = Employee(gym_id=gym_id, first_name='Bench', last_name=role, role=role, password='-')
+    db.session.add(employee)
+    db.session.commit()
+    return employee.employee_id
+
+
+def seed_subscription(rows):
+    subscription = Subscription(type='Bench', price=10, period=30)
+    db.session.add(subscription)
+    db.session.commit()
+
+    db.session.execute(insert(Customer), [
+        {"subscription_id": subscription.subscription_id, "first_name": "Bench", "last_name": str(i),
+         "sub_purchase_date": date(2026, 1, 1), "sub_expiry_date": date(2026, 1, 31)}
+        for i in range(rows)
+    ])
+    db.session.commit()
+    return subscription.subscription_id
+
+
+def seed_classes(gym_id, employee_id, rows):
+    db.session.execute(insert(GymClass), [
+        {"employee_id": employee_id, "gym_id": gym_id, "name": f"Class {i}", "max_people": 10,
+         "minute_of_week": i % 10080, "day_otw": (i % 10080) // 1440, "signed_people": 0}
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+
+def seed_gym(gym_id, rows):
+    # Spread the dependent rows over every table that references the gym
+    share = rows // 5
+    db.session.execute(insert(Employee), [
+        {"gym_id": gym_id, "first_name": "Bench", "last_name": str(i), "role": "receptionist", "password": "-"}
+        for i in range(share)
+    ])
+    db.session.execute(insert(Product), [
+        {"gym_id": gym_id, "name": f"Product {i}", "quantity_in_stock": 1, "quantity_sold": 0, "price": 1, "total_revenue": 0}
+        for i in range(share)
+    ])
+    seed_classes(gym_id, None, share)
+    db.session.execute(insert(Schedule), [
+        {"gym_id": gym_id, "day_otw": 0, "start_minute": i % 1380, "end_minute": i % 1380 + 60, "entry_type": "shift"}
+        for i in range(share)
+    ])
+    db.session.execute(insert(Sale), [
+        {"gym_id": gym_id, "quantity": 1, "unit_price": 1, "amount": 1}
+        for i in range(rows - 4 * share)
+    ])
+    db.session.commit()
+
+
+def legacy_delete_subscription(subscription_id):
+    subscription = db.session.get(Subscription, subscription_id)
+    for customer in Customer.query.filter_by(subscription_id=subscription_id).all():
+        customer.subscription_id = None
+        customer.sub_expiry_date = None
+    db.session.commit()
+    db.session.delete(subscription)
+    db.session.commit()
+
+
+def legacy_stop_coaching(employee_id):
+    for gym_class in GymClass.query.filter_by(employee_id=employee_id).all():
+        gym_class.employee_id = None
+    db.session.commit()
+    db.session.get(Employee, employee_id).role = 'receptionist'
+    db.session.commit()
+
+
+def legacy_delete_gym(gym_id):
+    for model in (Employee, Product, GymClass, Schedule, Sale):
+        model.query.filter_by(gym_id=gym_id).update({model.gym_id: None})
+    db.session.delete(db.session.get(Gym, gym_id))
+    db.session.commit()
+
+
+def timed(func, *args, **kwargs):
+    start = perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = perf_counter() - start
+    db.session.remove()
+    return elapsed, result
+
+
+def check(response):
+    if response.status_code != 200:
+        sys.exit(f"Route failed with {response.status_code}: {response.get_json()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000, help='dependent rows per cascade')
+    parser.add_argument('--legacy', action='store_true', help='also time the previous implementations')
+    args = parser.parse_args()
+
+    os.environ['DB_SCHEMA_MODE'] = 'skip'
+    app = create_app()
+    client = app.test_client()
+    results = []
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        manager_gym_id = add_gym()
+        client.post('/api/first_register', json={
+            "password": PASSWORD, "gym_id": manager_gym_id, "first_name": "Bench", "last_name": "Manager", "role": "manager",
+        })
+        manager_id = db.session.scalar(select(Employee.employee_id).where(Employee.role == 'manager'))
+        token = client.post('/api/login', json={
+            "employee_id": manager_id, "password": PASSWORD, "gym_id": manager_gym_id,
+        }).get_json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # delete_subscription
+        if args.legacy:
+            subscription_id = seed_subscription(args.rows)
+            elapsed, _ = timed(legacy_delete_subscription, subscription_id)
+            results.append(("delete_subscription", "legacy", elapsed))
+
+        subscription_id = seed_subscription(args.rows)
+        elapsed, response = timed(client.delete, f'/api/delete_subscription/{subscription_id}', headers=headers)
+        check(response)
+        assert count(Customer.subscription_id == subscription_id) == 0
+        results.append(("delete_subscription", "set-based", elapsed))
+
+        # update_employee, a coach becoming a receptionist. The classes belong to no gym so they
+        # don't add to the rows delete_gym has to detach below.
+        if args.legacy:
+            coach_id = add_employee(manager_gym_id, 'coach')
+            seed_classes(None, coach_id, args.rows)
+            elapsed, _ = timed(legacy_stop_coaching, coach_id)
+            results.append(("update_employee", "legacy", elapsed))
+
+        coach_id = add_employee(manager_gym_id, 'coach')
+        seed_classes(None, coach_id, args.rows)
+        elapsed, response = timed(client.put, f'/api/update_employee/{coach_id}', json={"role": "receptionist"}, headers=headers)
+        check(response)
+        assert count(GymClass.employee_id == coach_id) == 0
+        results.append(("update_employee", "set-based", elapsed))
+
+        # delete_gym, the route only lets a manager delete their own gym
+        if args.legacy:
+            gym_id = add_gym()
+            seed_gym(gym_id, args.rows)
+            elapsed, _ = timed(legacy_delete_gym, gym_id)
+            results.append(("delete_gym", "legacy", elapsed))
+
+        seed_gym(manager_gym_id, args.rows)
+        elapsed, response = timed(client.delete, f'/api/delete_gym/{manager_gym_id}', headers=headers)
+        check(response)
+        for model in (Employee, Product, GymClass, Schedule, Sale):
+            assert count(model.gym_id == manager_gym_id) == 0
+        results.append(("delete_gym", "set-based", elapsed))
+
+        dialect = db.engine.dialect.name
+
+    print(f"{dialect}, {args.rows} dependent rows per cascade")
+    print(f"{'cascade':>20} {'implementation':>15} {'seconds':>9}")
+    for name, implementation, elapsed in results:
+        print(f"{name:>20} {implementation:>15} {elapsed:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
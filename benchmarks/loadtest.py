@@ -0,0 +1,310 @@
+"""
+In-process load test: builds the app with create_app, seeds synthetic gyms, employees,
+customers, classes and products, then runs a weighted mix of requests from concurrent
+clients and writes per-endpoint latency percentiles and throughput to a JSON file.
+
+    python benchmarks/loadtest.py --gyms 5 --customers 2000 --clients 8 --duration 30 \\
+        --output results/$(git rev-parse --short HEAD).json --compare results/baseline.json
+
+Without DATABASE_URL a temporary SQLite file is used. With DATABASE_URL set (e.g. a local
+PostgreSQL) --reset is required: all tables are dropped and recreated before seeding.
+
+--mix sets the relative weight of each operation, e.g. "login=1,enroll=3,sell=3,list=5".
+Responses with a 5xx status or a transport error count as errors; 4xx answers such as a full
+class are expected under this workload and only show up in the status counts.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, time as time_of_day, timedelta
+from statistics import quantiles
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+USING_TEMP_DB = not os.getenv('DATABASE_URL')
+if USING_TEMP_DB:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'loadtest.db')
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('METRICS_ENABLED', 'false')
+
+from sqlalchemy import insert, select
+from app import create_app, db
+from app.models import Customer, Employee, Gym, GymClass, Product, Subscription, minute_of_week, subscription_expiry_date
+from app.passwords import hash_password
+
+PASSWORD = 'loadtest-password'
+DEFAULT_MIX = 'login=1,enroll=3,sell=3,list=5,check_validity=4,check_validities=1'
+
+
+def seed(app, args):
+    """Creates the schema and synthetic data; returns per gym ids the workload picks from."""
+    rng = random.Random(args.seed)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        password_hash = hash_password(PASSWORD)
+
+        db.session.execute(insert(Gym), [
+            {"name": f"Gym {g}", "address": f"Load street {g}"} for g in range(args.gyms)
+        ])
+        gym_ids = list(db.session.scalars(select(Gym.gym_id).order_by(Gym.gym_id)))
+
+        db.session.execute(insert(Subscription), [
+            {"type": "Monthly", "price": 99, "period": 30},
+            {"type": "Yearly", "price": 899, "period": 365},
+        ])
+        subscriptions = db.session.execute(select(Subscription.subscription_id, Subscription.period)).all()
+
+        db.session.execute(insert(Employee), [
+            {"gym_id": gym_id, "first_name": "Load", "last_name": f"{role} {gym_id}", "role": role, "password": password_hash}
+            for gym_id in gym_ids
+            for role in ('receptionist', 'coach')
+        ])
+        employees = db.session.execute(select(Employee.employee_id, Employee.gym_id, Employee.role)).all()
+
+        today = date.today()
+        customers = []
+        for i in range(args.customers):
+            subscription_id, period = rng.choice(subscriptions)
+            purchase_date = today - timedelta(days=rng.randrange(400))
+            customers.append({
+                "subscription_id": subscription_id,
+                "first_name": "Load",
+                "last_name": f"Customer {i}",
+                "address": "Load street",
+                "phone_number": "000000000",
+                "sub_purchase_date": purchase_date,
+                "sub_expiry_date": subscription_expiry_date(purchase_date, period),
+            })
+        db.session.execute(insert(Customer), customers)
+        customer_ids = list(db.session.scalars(select(Customer.customer_id)))
+
+        coaches = {gym_id: employee_id for employee_id, gym_id, role in employees if role == 'coach'}
+        db.session.execute(insert(GymClass), [
+            {
+                "employee_id": coaches[gym_id], "gym_id": gym_id, "name": f"Class {c}", "max_people": args.class_size,
+                "minute_of_week": minute_of_week(c % 7, time_of_day(6 + c % 14)), "day_otw": c % 7, "signed_people": 0,
+            }
+            for gym_id in gym_ids
+            for c in range(args.classes)
+        ])
+        db.session.execute(insert(Product), [
+            {
+                "gym_id": gym_id, "name": f"Product {p}", "quantity_in_stock": 10_000_000, "quantity_sold": 0,
+                "price": 5 + p % 20, "total_revenue": 0,
+            }
+            for gym_id in gym_ids
+            for p in range(args.products)
+        ])
+
+        gyms = {}
+        for gym_id in gym_ids:
+            gyms[gym_id] = {
+                "receptionist": next(e for e, g, role in employees if g == gym_id and role == 'receptionist'),
+                "classes": list(db.session.scalars(select(GymClass.gymclass_id).where(GymClass.gym_id == gym_id))),
+                "products": list(db.session.scalars(select(Product.product_id).where(Product.gym_id == gym_id))),
+            }
+
+        db.session.commit()
+
+    return gyms, customer_ids
+
+
+class Client:
+    """One simulated front desk: a test client logged in as the receptionist of one gym."""
+
+    def __init__(self, app, gym_id, gym, customer_ids, rng):
+        self.http = app.test_client()
+        self.gym_id = gym_id
+        self.gym = gym
+        self.customer_ids = customer_ids
+        self.rng = rng
+        self.headers = {}
+        self.login()
+
+    def login(self):
+        response = self.http.post('/api/login', json={
+            "employee_id": self.gym["receptionist"], "password": PASSWORD, "gym_id": self.gym_id,
+        })
+        if response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+        return response
+
+    def enroll(self):
+        gymclass_id = self.rng.choice(self.gym["classes"])
+        return self.http.post(
+            f'/api/enroll_customer/{gymclass_id}', json={"customerID": self.rng.choice(self.customer_ids)}, headers=self.headers
+        )
+
+    def sell(self):
+        return self.http.put(f'/api/sell_product/{self.rng.choice(self.gym["products"])}', headers=self.headers)
+
+    def list(self):
+        return self.http.get('/api/get_all_customers?limit=50&cursor=', headers=self.headers)
+
+    def check_validity(self):
+        return self.http.get(f'/api/check_sub_validity/{self.rng.choice(self.customer_ids)}', headers=self.headers)
+
+    def check_validities(self):
+        customer_ids = self.rng.sample(self.customer_ids, min(100, len(self.customer_ids)))
+        return self.http.post('/api/check_subs_validity', json={"customer_ids": customer_ids}, headers=self.headers)
+
+
+OPERATIONS = ('login', 'enroll', 'sell', 'list', 'check_validity', 'check_validities')
+
+
+def parse_mix(spec):
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, weight = item.partition('=')
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation '{name}', expected one of {', '.join(OPERATIONS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def worker(client, weights, stop_at, samples):
+    names = list(weights)
+    cumulative = list(weights.values())
+
+    while time.monotonic() < stop_at:
+        name = client.rng.choices(names, weights=cumulative)[0]
+        start = time.perf_counter()
+        try:
+            status = getattr(client, name)().status_code
+        except Exception:
+            status = None
+        samples.append((name, time.perf_counter() - start, status))
+
+
+def summarize(samples, duration):
+    by_name = {}
+    for name, elapsed, status in samples:
+        by_name.setdefault(name, []).append((elapsed, status))
+    by_name['total'] = [(elapsed, status) for _, elapsed, status in samples]
+
+    report = {}
+    for name, results in sorted(by_name.items()):
+        latencies = sorted(elapsed for elapsed, _ in results)
+        cuts = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        statuses = {}
+        for _, status in results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        report[name] = {
+            "requests": len(results),
+            "errors": sum(1 for _, status in results if status is None or status >= 500),
+            "rps": round(len(results) / duration, 2),
+            "p50_ms": round(cuts[49] * 1000, 3),
+            "p95_ms": round(cuts[94] * 1000, 3),
+            "p99_ms": round(cuts[98] * 1000, 3),
+            "statuses": statuses,
+        }
+    return report
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report, baseline=None):
+    header = f"{'endpoint':>17} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    if baseline:
+        header += f" {'p95 vs base':>12} {'req/s vs base':>14}"
+    print(header)
+
+    for name, row in report.items():
+        line = (
+            f"{name:>17} {row['requests']:>9} {row['errors']:>7} {row['rps']:>9.1f} "
+            f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}"
+        )
+        base = (baseline or {}).get(name)
+        if base and base['p95_ms'] and base['rps']:
+            line += f" {(row['p95_ms'] / base['p95_ms'] - 1) * 100:>+11.1f}% {(row['rps'] / base['rps'] - 1) * 100:>+13.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--gyms', type=int, default=5)
+    parser.add_argument('--customers', type=int, default=2000)
+    parser.add_argument('--classes', type=int, default=20, help='classes per gym')
+    parser.add_argument('--class-size', type=int, default=1000, help='max_people of every class')
+    parser.add_argument('--products', type=int, default=20, help='products per gym')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent clients, spread over the gyms')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='operation weights')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for data and request choice')
+    parser.add_argument('--output', default='loadtest.json', help='where to write the JSON report')
+    parser.add_argument('--compare', help='earlier JSON report to compare against')
+    parser.add_argument('--reset', action='store_true', help='allow dropping the tables of DATABASE_URL')
+    args = parser.parse_args()
+
+    if not USING_TEMP_DB and not args.reset:
+        parser.error('DATABASE_URL is set, pass --reset to drop and reseed its tables')
+
+    weights = parse_mix(args.mix)
+
+    os.environ['DB_SCHEMA_MODE'] = 'skip'
+    app = create_app()
+
+    seed_start = time.perf_counter()
+    gyms, customer_ids = seed(app, args)
+    seed_time = time.perf_counter() - seed_start
+
+    gym_ids = list(gyms)
+    clients = [
+        Client(app, gym_ids[i % len(gym_ids)], gyms[gym_ids[i % len(gym_ids)]], customer_ids, random.Random(args.seed + i))
+        for i in range(args.clients)
+    ]
+
+    samples = []
+    stop_at = time.monotonic() + args.duration
+    threads = [threading.Thread(target=worker, args=(client, weights, stop_at, samples)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+
+    report = summarize(samples, args.duration)
+    result = {
+        "commit": git_commit(),
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "database": dialect,
+        "seed_seconds": round(seed_time, 3),
+        "config": {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'reset')},
+        "endpoints": report,
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["endpoints"]
+
+    print(f"{dialect}, commit {result['commit']}, seeded in {seed_time:.1f} s, report written to {args.output}")
+    print_report(report, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Compares the ORM read path (load instances, build dicts, jsonify) with the column-projected
+path used by the read endpoints (select columns, build dicts from tuples, encode with orjson).
+
+    python benchmarks/serialization.py --rows 1000 10000 --repeat 20
+
+Without DATABASE_URL a temporary SQLite file is used. Customers are inserted into the
+configured database and left there, so point it at a throwaway database.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from statistics import median
+from time import perf_counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+if not os.getenv('DATABASE_URL'):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+from flask import jsonify
+from sqlalchemy import insert, select
+from app import create_app, db
+from app.models import Customer
+from app.routes.customer_routes import CUSTOMER_FIELDS
+from app.serialization import columns, rows_to_dicts, json_response
+
+
+def orm_path(limit):
+    customers = Customer.query.order_by(Customer.customer_id).limit(limit).all()
+    result = [
+        {
+            "customer_id": customer.customer_id,
+            "subscription_id": customer.subscription_id,
+            "first_name": customer.first_name,
+            "last_name": customer.last_name,
+            "address": customer.address,
+            "phone_number": customer.phone_number,
+            "sub_purchase_date": str(customer.sub_purchase_date),
+            "sub_expiry_date": str(customer.sub_expiry_date),
+        }
+        for customer in customers
+    ]
+    return jsonify(result).get_data()
+
+
+def projected_path(limit):
+    rows = db.session.execute(
+        select(*columns(CUSTOMER_FIELDS)).order_by(Customer.customer_id).limit(limit)
+    ).all()
+    return json_response(rows_to_dicts(CUSTOMER_FIELDS, rows)).get_data()
+
+
+def measure(func, limit, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func(limit)
+        timings.append(perf_counter() - start)
+        # Both paths start from an empty identity map, like a fresh request
+        db.session.remove()
+    return median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000], help='rows per response')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per measurement, the median is reported')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context(), app.test_request_context():
+        missing = max(args.rows) - db.session.scalar(select(db.func.count(Customer.customer_id)))
+        if missing > 0:
+            db.session.execute(insert(Customer), [
+                {"first_name": "Bench", "last_name": str(i), "address": "Benchmark street 1", "phone_number": "000000000"}
+                for i in range(missing)
+            ])
+            db.session.commit()
+
+        print(f"{'rows':>8} {'orm ms':>10} {'projected ms':>14} {'speedup':>9}")
+        for limit in args.rows:
+            orm = measure(orm_path, limit, args.repeat)
+            projected = measure(projected_path, limit, args.repeat)
+            print(f"{limit:>8} {orm * 1000:>10.2f} {projected * 1000:>14.2f} {orm / projected:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Measures process startup from a cold interpreter to the first served request, once per
+DB_SCHEMA_MODE: `create` (db.create_all on every boot), `check` (one alembic_version query)
+and `skip`.
+
+    python benchmarks/startup.py --runs 10 --modes create check skip
+
+Every run is a fresh subprocess and reports the time spent importing the app package,
+in create_app and serving the first request (GET --path, /metrics by default). Without
+DATABASE_URL a temporary SQLite file is created and stamped at the newest migration.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from statistics import median
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CHILD = """
+import json, sys
+from time import perf_counter
+start = perf_counter()
+from app import create_app
+imported = perf_counter()
+app = create_app()
+created = perf_counter()
+status = app.test_client().get(sys.argv[1]).status_code
+served = perf_counter()
+print(json.dumps({"import": imported - start, "create_app": created - imported, "first_request": served - created, "status": status}))
+"""
+
+
+def prepare_database(env):
+    # The migrations start from an existing schema, so create it and mark it as current
+    script = (
+        "from app import create_app\n"
+        "from flask_migrate import stamp\n"
+        "app = create_app()\n"
+        "with app.app_context():\n"
+        "    stamp()\n"
+    )
+    subprocess.run([sys.executable, '-c', script], cwd=ROOT, env={**env, 'DB_SCHEMA_MODE': 'create'}, check=True)
+
+
+def run_once(env, mode, request_path):
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD, request_path],
+        cwd=ROOT, env={**env, 'DB_SCHEMA_MODE': mode}, check=True, capture_output=True, text=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='processes started per mode, medians are reported')
+    parser.add_argument('--modes', nargs='+', default=['create', 'check', 'skip'], help='DB_SCHEMA_MODE values to compare')
+    parser.add_argument('--path', default='/metrics', help='path requested as the first request')
+    args = parser.parse_args()
+
+    env = {**os.environ, 'LOG_LEVEL': 'WARNING'}
+    if not env.get('DATABASE_URL'):
+        env['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+        prepare_database(env)
+
+    print(f"{'mode':>8} {'import ms':>10} {'create_app ms':>14} {'first req ms':>13} {'total ms':>9}")
+    for mode in args.modes:
+        samples = [run_once(env, mode, args.path) for _ in range(args.runs)]
+        phases = {key: median(sample[key] for sample in samples) for key in ('import', 'create_app', 'first_request')}
+        total = median(sum(sample[key] for key in phases) for sample in samples)
+        print(
+            f"{mode:>8} {phases['import'] * 1000:>10.1f} {phases['create_app'] * 1000:>14.1f} "
+            f"{phases['first_request'] * 1000:>13.1f} {total * 1000:>9.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Compares server setups under the same load: the Flask development server started by run.py
+and gunicorn (gunicorn.conf.py) with different worker x thread counts.
+
+    python benchmarks/throughput.py --configs dev 1x1 1x4 2x4 4x4 --clients 16 --duration 10
+
+Each setup is started as a subprocess, then --clients keep-alive connections request --path
+(an authenticated list endpoint by default) as fast as they can for --duration seconds.
+Requests per second and p50/p99 latency are reported. Without DATABASE_URL a temporary
+SQLite file is used; the first manager is registered there if none exists.
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from statistics import quantiles
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+if not os.getenv('DATABASE_URL'):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from app import create_app, db
+from app.models import Gym
+
+PASSWORD = 'benchmark-password'
+
+
+def access_token():
+    app = create_app()
+    client = app.test_client()
+
+    with app.app_context():
+        gym = db.session.get(Gym, 1)
+        if gym is None:
+            db.session.add(Gym(name='Benchmark gym', address='Benchmark street 1'))
+            db.session.commit()
+
+    client.post('/api/first_register', json={
+        "password": PASSWORD, "gym_id": 1, "first_name": "Bench", "last_name": "Manager", "role": "manager",
+    })
+    response = client.post('/api/login', json={"employee_id": 1, "password": PASSWORD, "gym_id": 1})
+    if response.status_code != 200:
+        sys.exit(f"Could not log in as employee 1: {response.get_json()}")
+
+    return response.get_json()["access_token"]
+
+
+def start_server(config, port):
+    env = {**os.environ, 'DB_SCHEMA_MODE': 'skip'}
+
+    if config == 'dev':
+        command = [sys.executable, '-c', f"from wsgi import app; app.run(port={port})"]
+    else:
+        workers, threads = config.split('x')
+        env.update(WEB_CONCURRENCY=workers, WEB_THREADS=threads, WEB_BIND=f"127.0.0.1:{port}")
+        command = [sys.executable, '-m', 'gunicorn', 'wsgi:app']
+
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/metrics')
+            connection.getresponse().read()
+            return process
+        except OSError:
+            time.sleep(0.1)
+
+    process.terminate()
+    sys.exit(f"Server '{config}' did not start")
+
+
+def client(port, path, headers, stop_at, latencies, errors):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append(1)
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+
+        latencies.append(time.perf_counter() - start)
+        if response.status >= 400:
+            errors.append(response.status)
+
+
+def run_load(port, path, headers, clients, duration):
+    latencies, errors = [], []
+    stop_at = time.monotonic() + duration
+    workers = [
+        threading.Thread(target=client, args=(port, path, headers, stop_at, latencies, errors))
+        for _ in range(clients)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', nargs='+', default=['dev', '1x1', '1x4', '2x4'], help="'dev' or WORKERSxTHREADS")
+    parser.add_argument('--clients', type=int, default=16, help='concurrent keep-alive connections')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load per setup')
+    parser.add_argument('--path', default='/api/get_all_customers?limit=20', help='path to request')
+    parser.add_argument('--port', type=int, default=8765, help='port the servers listen on')
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {access_token()}"}
+
+    print(f"{'setup':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for config in args.configs:
+        process = start_server(config, args.port)
+        try:
+            # A short warm-up so lazily created connections and caches don't count
+            run_load(args.port, args.path, headers, args.clients, 1)
+            latencies, errors = run_load(args.port, args.path, headers, args.clients, args.duration)
+        finally:
+            process.terminate()
+            process.wait()
+
+        if len(latencies) < 2:
+            print(f"{config:>8} {'no responses':>9}")
+            continue
+
+        cuts = quantiles(latencies, n=100)
+        print(
+            f"{config:>8} {len(latencies):>9} {len(errors):>7} {len(latencies) / args.duration:>9.1f} "
+            f"{cuts[49] * 1000:>8.2f} {cuts[98] * 1000:>8.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
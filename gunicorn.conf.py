@@ -0,0 +1,48 @@
+"""
+Production server settings, used by `gunicorn wsgi:app` (gunicorn picks this file up from
+the working directory). Every value can be overridden from the environment.
+"""
+from multiprocessing import cpu_count
+from os import environ, getenv
+from tempfile import mkdtemp
+
+
+def _flag(name, default):
+    return getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+bind = getenv('WEB_BIND', f"0.0.0.0:{getenv('PORT', '8000')}")
+
+# Threads serve requests while others wait on PostgreSQL or bcrypt. A thread holds at most one
+# connection, so each worker's pool defaults to one connection per thread, and the default
+# worker count (one per CPU, see benchmarks/throughput.py in the README) is capped so that
+# workers x threads stays within DB_CONNECTION_BUDGET, below PostgreSQL's default
+# max_connections of 100
+worker_class = 'gthread'
+threads = int(getenv('WEB_THREADS', 4))
+workers = int(getenv('WEB_CONCURRENCY', max(1, min(cpu_count(), int(getenv('DB_CONNECTION_BUDGET', 80)) // threads))))
+
+environ.setdefault('DB_POOL_SIZE', str(threads))
+environ.setdefault('DB_MAX_OVERFLOW', '0')
+
+keepalive = int(getenv('WEB_KEEPALIVE', 5))
+timeout = int(getenv('WEB_TIMEOUT', 30))
+graceful_timeout = int(getenv('WEB_GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers now and then to cap slow memory growth, jittered so they don't all restart at once
+max_requests = int(getenv('WEB_MAX_REQUESTS', 10000))
+max_requests_jitter = int(getenv('WEB_MAX_REQUESTS_JITTER', 1000))
+
+preload_app = _flag('WEB_PRELOAD', 'true')
+
+accesslog = getenv('WEB_ACCESS_LOG') or None
+
+# Workers write their request metrics to files here so /metrics can sum them. Must be set before
+# the app (and prometheus_client) is imported; a directory passed in should be emptied on deploy.
+if not getenv('PROMETHEUS_MULTIPROC_DIR'):
+    environ['PROMETHEUS_MULTIPROC_DIR'] = mkdtemp(prefix='gym-metrics-')
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
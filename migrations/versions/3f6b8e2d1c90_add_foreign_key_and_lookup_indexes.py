@@ -0,0 +1,47 @@
+"""Add foreign key and lookup indexes
+
+Revision ID: 3f6b8e2d1c90
+Revises: e1b7a9d4c352
+Create Date: 2026-10-17 20:12:54.390417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6b8e2d1c90'
+down_revision = 'e1b7a9d4c352'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_employee_gym_id', 'employee', ['gym_id']),
+    ('ix_employee_role', 'employee', ['role']),
+    ('ix_customer_subscription_id', 'customer', ['subscription_id']),
+    ('ix_schedule_gym_id_schedule_id', 'schedule', ['gym_id', 'schedule_id']),
+    ('ix_schedule_gymclass_id', 'schedule', ['gymclass_id']),
+    ('ix_schedule_employee_id', 'schedule', ['employee_id']),
+    ('ix_product_gym_id', 'product', ['gym_id']),
+    ('ix_sale_product_id', 'sale', ['product_id']),
+    ('ix_sale_gym_id', 'sale', ['gym_id']),
+    ('ix_daily_revenue_gym_id_day', 'daily_revenue', ['gym_id', 'day']),
+    ('ix_monthly_revenue_gym_id_month', 'monthly_revenue', ['gym_id', 'month']),
+    ('ix_gym_class_employee_id', 'gym_class', ['employee_id']),
+    ('ix_gym_class_gym_id', 'gym_class', ['gym_id']),
+    ('ix_customer_gym_class_gymclass_id', 'customer_gym_class', ['gymclass_id']),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY doesn't lock writes on PostgreSQL but can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
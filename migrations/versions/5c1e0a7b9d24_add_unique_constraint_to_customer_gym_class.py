@@ -0,0 +1,32 @@
+"""Add unique constraint on customer_id and gymclass_id in CustomerGymClass
+
+Revision ID: 5c1e0a7b9d24
+Revises: 2b386140e9ca
+Create Date: 2026-10-17 18:05:12.431920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e0a7b9d24'
+down_revision = '2b386140e9ca'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the oldest row of every duplicated enrollment so the constraint can be created
+    op.execute(
+        "DELETE FROM customer_gym_class WHERE id NOT IN "
+        "(SELECT MIN(id) FROM customer_gym_class GROUP BY customer_id, gymclass_id)"
+    )
+
+    with op.batch_alter_table('customer_gym_class', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_customer_gymclass', ['customer_id', 'gymclass_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('customer_gym_class', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_customer_gymclass', type_='unique')
@@ -0,0 +1,178 @@
+"""Store schedule and class days as numbers and times as minute of week
+
+Revision ID: 7d3a1f9c5b26
+Revises: 3f6b8e2d1c90
+Create Date: 2026-10-17 21:05:41.662310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import time
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3a1f9c5b26'
+down_revision = '3f6b8e2d1c90'
+branch_labels = None
+depends_on = None
+
+
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+MINUTES_PER_DAY = 24 * 60
+
+
+def day_number(value):
+    name = (value or '').strip().lower()
+    for number, day in enumerate(DAYS):
+        if name in (day.lower(), day[:3].lower()):
+            return number
+    return None
+
+
+def minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def time_of(minute):
+    minute %= MINUTES_PER_DAY
+    return time(minute // 60, minute % 60)
+
+
+def convert(table, key, rows, build):
+    # build(row) returns the new values of a row or None when its day can't be recognised
+    updates, invalid = [], []
+    for row in rows:
+        values = build(row)
+        if values is None:
+            invalid.append(row[0])
+        else:
+            updates.append({'b_key': row[0], **values})
+
+    if invalid:
+        raise RuntimeError(
+            f"{table.name} rows {invalid[:20]} have a day_otw that is not a weekday name, fix them before upgrading"
+        )
+
+    if updates:
+        op.get_bind().execute(
+            table.update()
+            .where(table.c[key] == sa.bindparam('b_key'))
+            .values({name: sa.bindparam(name) for name in updates[0] if name != 'b_key'}),
+            updates
+        )
+
+
+def upgrade():
+    with op.batch_alter_table('schedule', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('day_number', sa.SmallInteger(), nullable=True))
+        batch_op.add_column(sa.Column('start_minute', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('end_minute', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('gym_class', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('day_number', sa.SmallInteger(), nullable=True))
+        batch_op.add_column(sa.Column('minute_of_week', sa.Integer(), nullable=True))
+
+    schedule = sa.table(
+        'schedule',
+        sa.column('schedule_id', sa.Integer), sa.column('day_otw', sa.String), sa.column('start_time', sa.Time),
+        sa.column('end_time', sa.Time), sa.column('day_number', sa.SmallInteger), sa.column('start_minute', sa.Integer),
+        sa.column('end_minute', sa.Integer),
+    )
+    gym_class = sa.table(
+        'gym_class',
+        sa.column('gymclass_id', sa.Integer), sa.column('day_otw', sa.String), sa.column('time', sa.Time),
+        sa.column('day_number', sa.SmallInteger), sa.column('minute_of_week', sa.Integer),
+    )
+    bind = op.get_bind()
+
+    def schedule_values(row):
+        day = day_number(row[1])
+        if day is None:
+            return None
+        return {
+            'day_number': day,
+            'start_minute': day * MINUTES_PER_DAY + minutes(row[2]),
+            'end_minute': day * MINUTES_PER_DAY + minutes(row[3]),
+        }
+
+    def gym_class_values(row):
+        day = day_number(row[1])
+        if day is None:
+            return None
+        return {'day_number': day, 'minute_of_week': day * MINUTES_PER_DAY + minutes(row[2])}
+
+    convert(schedule, 'schedule_id', bind.execute(
+        sa.select(schedule.c.schedule_id, schedule.c.day_otw, schedule.c.start_time, schedule.c.end_time)
+    ).all(), schedule_values)
+    convert(gym_class, 'gymclass_id', bind.execute(
+        sa.select(gym_class.c.gymclass_id, gym_class.c.day_otw, gym_class.c.time)
+    ).all(), gym_class_values)
+
+    with op.batch_alter_table('schedule', schema=None) as batch_op:
+        batch_op.drop_column('day_otw')
+        batch_op.drop_column('start_time')
+        batch_op.drop_column('end_time')
+        batch_op.alter_column('day_number', new_column_name='day_otw', existing_type=sa.SmallInteger(), nullable=False)
+        batch_op.alter_column('start_minute', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('end_minute', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index('ix_schedule_gym_id_start_minute', ['gym_id', 'start_minute'], unique=False)
+
+    with op.batch_alter_table('gym_class', schema=None) as batch_op:
+        batch_op.drop_column('day_otw')
+        batch_op.drop_column('time')
+        batch_op.alter_column('day_number', new_column_name='day_otw', existing_type=sa.SmallInteger(), nullable=False)
+        batch_op.alter_column('minute_of_week', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index('ix_gym_class_gym_id_minute_of_week', ['gym_id', 'minute_of_week'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('schedule', schema=None) as batch_op:
+        batch_op.drop_index('ix_schedule_gym_id_start_minute')
+        batch_op.alter_column('day_otw', new_column_name='day_number', existing_type=sa.SmallInteger())
+
+    with op.batch_alter_table('schedule', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('day_otw', sa.String(length=15), nullable=True))
+        batch_op.add_column(sa.Column('start_time', sa.Time(), nullable=True))
+        batch_op.add_column(sa.Column('end_time', sa.Time(), nullable=True))
+
+    with op.batch_alter_table('gym_class', schema=None) as batch_op:
+        batch_op.drop_index('ix_gym_class_gym_id_minute_of_week')
+        batch_op.alter_column('day_otw', new_column_name='day_number', existing_type=sa.SmallInteger())
+
+    with op.batch_alter_table('gym_class', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('day_otw', sa.String(length=15), nullable=True))
+        batch_op.add_column(sa.Column('time', sa.Time(), nullable=True))
+
+    schedule = sa.table(
+        'schedule',
+        sa.column('schedule_id', sa.Integer), sa.column('day_number', sa.SmallInteger), sa.column('start_minute', sa.Integer),
+        sa.column('end_minute', sa.Integer), sa.column('day_otw', sa.String), sa.column('start_time', sa.Time),
+        sa.column('end_time', sa.Time),
+    )
+    gym_class = sa.table(
+        'gym_class',
+        sa.column('gymclass_id', sa.Integer), sa.column('day_number', sa.SmallInteger), sa.column('minute_of_week', sa.Integer),
+        sa.column('day_otw', sa.String), sa.column('time', sa.Time),
+    )
+    bind = op.get_bind()
+
+    convert(schedule, 'schedule_id', bind.execute(
+        sa.select(schedule.c.schedule_id, schedule.c.day_number, schedule.c.start_minute, schedule.c.end_minute)
+    ).all(), lambda row: {'day_otw': DAYS[row[1]], 'start_time': time_of(row[2]), 'end_time': time_of(row[3])})
+    convert(gym_class, 'gymclass_id', bind.execute(
+        sa.select(gym_class.c.gymclass_id, gym_class.c.day_number, gym_class.c.minute_of_week)
+    ).all(), lambda row: {'day_otw': DAYS[row[1]], 'time': time_of(row[2])})
+
+    with op.batch_alter_table('schedule', schema=None) as batch_op:
+        batch_op.drop_column('day_number')
+        batch_op.drop_column('start_minute')
+        batch_op.drop_column('end_minute')
+        batch_op.alter_column('day_otw', existing_type=sa.String(length=15), nullable=False)
+        batch_op.alter_column('start_time', existing_type=sa.Time(), nullable=False)
+        batch_op.alter_column('end_time', existing_type=sa.Time(), nullable=False)
+
+    with op.batch_alter_table('gym_class', schema=None) as batch_op:
+        batch_op.drop_column('day_number')
+        batch_op.drop_column('minute_of_week')
+        batch_op.alter_column('day_otw', existing_type=sa.String(length=15), nullable=False)
+        batch_op.alter_column('time', existing_type=sa.Time(), nullable=False)
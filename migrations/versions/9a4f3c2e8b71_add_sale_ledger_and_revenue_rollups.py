@@ -0,0 +1,53 @@
+"""Add Sale ledger and DailyRevenue, MonthlyRevenue rollups
+
+Revision ID: 9a4f3c2e8b71
+Revises: 5c1e0a7b9d24
+Create Date: 2026-10-17 18:31:47.205613
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4f3c2e8b71'
+down_revision = '5c1e0a7b9d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sale',
+        sa.Column('sale_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=True),
+        sa.Column('gym_id', sa.Integer(), nullable=True),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('unit_price', sa.Numeric(precision=5, scale=2), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('sold_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+        sa.ForeignKeyConstraint(['gym_id'], ['gym.gym_id'], ),
+        sa.ForeignKeyConstraint(['product_id'], ['product.product_id'], ),
+        sa.PrimaryKeyConstraint('sale_id')
+    )
+    op.create_table('daily_revenue',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('gym_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('quantity_sold', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'gym_id', 'product_id')
+    )
+    op.create_table('monthly_revenue',
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('gym_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('quantity_sold', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('month', 'gym_id', 'product_id')
+    )
+
+
+def downgrade():
+    op.drop_table('monthly_revenue')
+    op.drop_table('daily_revenue')
+    op.drop_table('sale')
@@ -0,0 +1,41 @@
+"""Index gym classes for time window search
+
+Revision ID: a4c9e7b2d815
+Revises: 7d3a1f9c5b26
+Create Date: 2026-10-17 21:48:19.205774
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c9e7b2d815'
+down_revision = '7d3a1f9c5b26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Built concurrently like 3f6b8e2d1c90, so writes to gym_class aren't blocked on PostgreSQL.
+    # The new indexes exist before the old one is dropped.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_gym_class_gym_id_minute_of_week_gymclass_id', 'gym_class', ['gym_id', 'minute_of_week', 'gymclass_id'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_gym_class_gym_id_employee_id_minute_of_week', 'gym_class', ['gym_id', 'employee_id', 'minute_of_week', 'gymclass_id'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True
+        )
+        op.drop_index('ix_gym_class_gym_id_minute_of_week', table_name='gym_class', if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_gym_class_gym_id_minute_of_week', 'gym_class', ['gym_id', 'minute_of_week'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True
+        )
+        op.drop_index('ix_gym_class_gym_id_employee_id_minute_of_week', table_name='gym_class', if_exists=True, postgresql_concurrently=True)
+        op.drop_index('ix_gym_class_gym_id_minute_of_week_gymclass_id', table_name='gym_class', if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,26 @@
+"""Add tokens_revoked_at to employee
+
+Revision ID: b5d8f2a6c317
+Revises: a4c9e7b2d815
+Create Date: 2026-10-18 09:12:37.418205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d8f2a6c317'
+down_revision = 'a4c9e7b2d815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('employee', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tokens_revoked_at', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('employee', schema=None) as batch_op:
+        batch_op.drop_column('tokens_revoked_at')
@@ -0,0 +1,29 @@
+"""Replace employee tokens_revoked_at with token_version
+
+Revision ID: c3a7e5d1f842
+Revises: b5d8f2a6c317
+Create Date: 2026-10-18 14:03:52.730916
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a7e5d1f842'
+down_revision = 'b5d8f2a6c317'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tokens issued before the upgrade carry no version claim and count as version 0
+    with op.batch_alter_table('employee', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.drop_column('tokens_revoked_at')
+
+
+def downgrade():
+    with op.batch_alter_table('employee', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tokens_revoked_at', sa.Integer(), nullable=True))
+        batch_op.drop_column('token_version')
@@ -0,0 +1,39 @@
+"""Add indexed sub_expiry_date to Customer
+
+Revision ID: c8d2e5f1a630
+Revises: 9a4f3c2e8b71
+Create Date: 2026-10-17 19:02:33.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8d2e5f1a630'
+down_revision = '9a4f3c2e8b71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('customer', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sub_expiry_date', sa.Date(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_customer_sub_expiry_date'), ['sub_expiry_date'], unique=False)
+
+    if op.get_bind().dialect.name == 'sqlite':
+        expiry = "date(customer.sub_purchase_date, '+' || subscription.period || ' days')"
+    else:
+        expiry = "customer.sub_purchase_date + subscription.period"
+
+    op.execute(
+        f"UPDATE customer SET sub_expiry_date = (SELECT {expiry} FROM subscription "
+        "WHERE subscription.subscription_id = customer.subscription_id) "
+        "WHERE subscription_id IS NOT NULL AND sub_purchase_date IS NOT NULL"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('customer', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_customer_sub_expiry_date'))
+        batch_op.drop_column('sub_expiry_date')
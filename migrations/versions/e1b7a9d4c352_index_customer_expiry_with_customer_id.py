@@ -0,0 +1,36 @@
+"""Replace sub_expiry_date index with (sub_expiry_date, customer_id) in Customer
+
+Revision ID: e1b7a9d4c352
+Revises: c8d2e5f1a630
+Create Date: 2026-10-17 19:40:08.671254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b7a9d4c352'
+down_revision = 'c8d2e5f1a630'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # customer is the largest table, build concurrently so writes aren't blocked on PostgreSQL.
+    # The new index exists before the old one is dropped.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_customer_sub_expiry_date_customer_id', 'customer', ['sub_expiry_date', 'customer_id'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True
+        )
+        op.drop_index('ix_customer_sub_expiry_date', table_name='customer', if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_customer_sub_expiry_date', 'customer', ['sub_expiry_date'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True
+        )
+        op.drop_index('ix_customer_sub_expiry_date_customer_id', table_name='customer', if_exists=True, postgresql_concurrently=True)
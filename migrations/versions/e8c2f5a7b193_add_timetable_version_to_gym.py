@@ -0,0 +1,26 @@
+"""Add timetable_version to gym
+
+Revision ID: e8c2f5a7b193
+Revises: c3a7e5d1f842
+Create Date: 2026-10-18 15:27:09.581342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8c2f5a7b193'
+down_revision = 'c3a7e5d1f842'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('gym', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('timetable_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('gym', schema=None) as batch_op:
+        batch_op.drop_column('timetable_version')
@@ -1,18 +1,72 @@
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from flask import jsonify
+from flask_jwt_extended import jwt_required, get_jwt
+from flask import jsonify, request, current_app, stream_with_context
 from functools import wraps
+from sqlalchemy import select, update
+from app import db
 from app.models import Employee
+from app.serialization import columns, rows_to_dicts, json_response, dumps, export_value
+from threading import Lock
+from time import monotonic
+import base64
+import binascii
+import csv
+import io
 import logging
 
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+EXPORT_CHUNK_SIZE = 1000
+MAX_PAGE_SIZE = 1000
+
+# employee_id (JWT identity) -> (expires_at, token_version or None for a deleted employee).
+# Keeps the database off the request path: another worker's revocation is seen once the
+# entry is older than REVOCATION_CACHE_TTL.
+_token_versions = {}
+_token_versions_lock = Lock()
+
+
+def revoke_employee_tokens(employee_id):
+    """
+    Rejects every token issued to `employee_id` up to now by bumping their token_version,
+    which login signs into the "ver" claim. Committed with the change that caused it.
+    """
+    db.session.execute(
+        update(Employee)
+        .where(Employee.employee_id == employee_id)
+        .values(token_version=Employee.token_version + 1)
+    )
+
+    with _token_versions_lock:
+        _token_versions.pop(str(employee_id), None)
+
+
+def is_token_revoked(jwt_header, jwt_payload):
+    employee_id = jwt_payload['sub']
+    token_version = jwt_payload.get('ver', 0)
+    now = monotonic()
+
+    cached = _token_versions.get(employee_id)
+
+    # A token newer than the cached version means this worker's copy is out of date
+    if cached is None or cached[0] <= now or (cached[1] is not None and token_version > cached[1]):
+        current = db.session.scalar(select(Employee.token_version).where(Employee.employee_id == int(employee_id)))
+        cached = (now + current_app.config['REVOCATION_CACHE_TTL'], current)
+
+        with _token_versions_lock:
+            _token_versions[employee_id] = cached
+
+    # A deleted employee has no version and no valid tokens
+    return cached[1] is None or token_version < cached[1]
+
+
 def role_required(required_roles: list):
     def decorator(func):
         @jwt_required()
         @wraps(func)
         def wrapper(*args, **kwargs):
-            current_user = get_jwt_identity()
-            user_data = Employee.query.get(current_user)
-
-            if user_data and user_data.role in required_roles:
+            # The role claim is signed by auth.login, revoked tokens never reach this point
+            if get_jwt().get('role') in required_roles:
                 return func(*args, **kwargs)
             else:
                 return jsonify({'msg': 'Access denied'}), 403
@@ -25,5 +79,125 @@ def check_gym_mismatch(data):
     user_gym_id = jwt_payload.get('gym_id')
 
     if user_gym_id != data['gym_id']:
-        logging.warning("You are not authorized to modify this gym")
-        return jsonify({"msg": "You are not authorized to modify this gym"}), 403
\ No newline at end of file
+        logger.warning("You are not authorized to modify this gym")
+        return jsonify({"msg": "You are not authorized to modify this gym"}), 403
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, parse=int):
+    # An empty cursor starts keyset pagination from the first row
+    if not cursor:
+        return None
+
+    try:
+        return parse(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def paginate(fields, pk_column, *criteria):
+    """
+    Returns a page of the projected `fields` ordered by `pk_column`, filtered by `criteria`.
+
+    Without a `cursor` argument the legacy limit/offset mode is used and a plain list is returned.
+    With `cursor` (empty for the first page) rows are seeked with `pk > last` and the response is
+    wrapped in an envelope carrying `next_cursor`, which is null on the last page.
+    """
+    limit = request.args.get('limit', 5, type=int)
+    query = select(*columns(fields)).where(*criteria).order_by(pk_column)
+
+    if 'cursor' not in request.args:
+        offset = request.args.get('offset', 0, type=int)
+        rows = db.session.execute(query.limit(limit).offset(offset)).all()
+        return json_response(rows_to_dicts(fields, rows))
+
+    # A limit below 1 would end the page walk early with next_cursor null while rows remain
+    try:
+        limit = int(request.args.get('limit', 5))
+    except ValueError:
+        limit = None
+
+    if limit is None or not 0 < limit <= MAX_PAGE_SIZE:
+        logger.error("Invalid limit value")
+        return jsonify({"msg": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+
+    try:
+        last_id = decode_cursor(request.args['cursor'])
+    except ValueError:
+        logger.warning("Invalid pagination cursor provided")
+        return jsonify({"msg": "Invalid cursor"}), 400
+
+    if last_id is not None:
+        query = query.where(pk_column > last_id)
+
+    # Fetch one extra row to know whether another page exists
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    next_cursor = None
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][columns(fields).index(pk_column)])
+
+    return json_response({"items": rows_to_dicts(fields, rows), "next_cursor": next_cursor})
+
+
+
+def export_rows(fields, pk_column, name, *criteria):
+    """
+    Streams every row of the projected `fields` as NDJSON or CSV (`format` argument).
+    Rows are read through a server-side cursor in chunks of EXPORT_CHUNK_SIZE, so memory
+    use doesn't grow with the table.
+    """
+    export_format = request.args.get('format', 'ndjson')
+
+    if export_format not in EXPORT_FORMATS:
+        logger.error("Invalid export format: %s", export_format)
+        return jsonify({"msg": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    names = [field_name for field_name, _, _ in fields]
+    converters = [convert for _, _, convert in fields]
+    query = (
+        select(*columns(fields))
+        .where(*criteria)
+        .order_by(pk_column)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+
+    def values(row):
+        # NULLs stay NULL, stored codes such as day numbers are still converted to their API form
+        return [
+            export_value(value if convert is None or value is None else convert(value))
+            for value, convert in zip(row, converters)
+        ]
+
+    def generate():
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            yield buffer.getvalue()
+
+        result = db.session.execute(query)
+
+        try:
+            for rows in result.partitions():
+                if export_format == 'csv':
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerows(values(row) for row in rows)
+                    yield buffer.getvalue()
+                else:
+                    yield b''.join(
+                        dumps(dict(zip(names, values(row)))) + b'\n'
+                        for row in rows
+                    )
+        finally:
+            result.close()
+
+    response = current_app.response_class(stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{name}.{export_format}"'
+
+    return response